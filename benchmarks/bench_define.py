@@ -0,0 +1,74 @@
+"""
+import-time benchmark of a module defining thousands of lambda factories,
+comparing the registry based naming of anonymous factories with the previous
+probing of free module attributes.
+
+    python benchmarks/bench_define.py
+"""
+import importlib
+import os
+import sys
+import tempfile
+import time
+from types import ModuleType
+from typing import Any, Callable
+
+from simple_di import providers
+
+SIZES = (100, 1000, 5000)
+
+
+def _legacy_patch_anonymous(func: Any) -> None:
+    module = importlib.import_module(func.__module__)
+    name = "__simple_di_" + func.__qualname__.replace(".", "_").replace(
+        "<lambda>", "lambda"
+    )
+    num = 0
+    while hasattr(module, f"{name}{num or ''}"):
+        num += 1
+    name = f"{name}{num or ''}"
+    func.__qualname__ = name
+    func.__name__ = name
+    setattr(module, name, func)
+
+
+def _write_module(directory: str, name: str, size: int) -> None:
+    lines = ["from simple_di.providers import Factory", ""]
+    lines.extend(f"p{i} = Factory(lambda: {i})" for i in range(size))
+    with open(os.path.join(directory, f"{name}.py"), "w") as f:
+        f.write("\n".join(lines) + "\n")
+
+
+def _import(name: str) -> float:
+    sys.modules.pop(name, None)
+    importlib.invalidate_caches()
+    start = time.perf_counter()
+    module: ModuleType = importlib.import_module(name)
+    cost = time.perf_counter() - start
+    assert module.p0.get() == 0
+    return cost
+
+
+def main() -> None:
+    patch_anonymous: Callable[[Any], None] = providers._patch_anonymous
+    with tempfile.TemporaryDirectory() as directory:
+        sys.path.insert(0, directory)
+        for size in SIZES:
+            name = f"_bench_define_{size}"
+            _write_module(directory, name, size)
+            _import(name)  # warm up the bytecode cache
+            for label, patch in (
+                ("legacy", _legacy_patch_anonymous),
+                ("registry", patch_anonymous),
+            ):
+                setattr(providers, "_patch_anonymous", patch)
+                try:
+                    cost = min(_import(name) for _ in range(3))
+                finally:
+                    setattr(providers, "_patch_anonymous", patch_anonymous)
+                label = f"{label} import of {size} lambda factories"
+                print(f"{label:<48}{cost * 1e3:>10.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+micro-benchmark of the per-call overhead of `inject`, comparing the precompiled
+injection plan and the generated wrapper of `compiled=True` with the previous
+`Signature.bind_partial` based wrapper.
+
+    python benchmarks/bench_inject.py
+"""
+import functools
+import inspect
+import timeit
+from typing import Any, Callable, Dict
+
+from simple_di import Provide, _inject_args, _inject_kwargs, _SentinelClass, inject
+from simple_di.providers import Static
+
+NUMBER = 200000
+
+DEP = Static(1)
+
+
+def _legacy_inject(func: Callable[..., Any], squeeze_none: bool = False) -> Any:
+    sig = inspect.signature(func)
+
+    @functools.wraps(func)
+    def _(*args: Any, **kwargs: Any) -> Any:
+        if not squeeze_none:
+            filtered_args = tuple(a for a in args if not isinstance(a, _SentinelClass))
+            filtered_kwargs = {
+                k: v for k, v in kwargs.items() if not isinstance(v, _SentinelClass)
+            }
+        else:
+            filtered_args = tuple(a for a in args if a is not None)
+            filtered_kwargs = {k: v for k, v in kwargs.items() if v is not None}
+
+        bind = sig.bind_partial(*filtered_args, **filtered_kwargs)
+        bind.apply_defaults()
+
+        return func(*_inject_args(bind.args), **_inject_kwargs(bind.kwargs))
+
+    return _
+
+
+def plain(a: int, b: int = 0) -> int:
+    return a
+
+
+def injected(a: int, b: int = Provide[DEP], c: int = Provide[DEP]) -> int:
+    return a
+
+
+CASES: Dict[str, Callable[[Callable[..., Any]], Any]] = {
+    "call all injected": lambda f: f(1),
+    "call all passed": lambda f: f(1, 2, c=3),
+}
+
+
+def main() -> None:
+    base = timeit.timeit(lambda: plain(1), number=NUMBER)
+    print(f"{'undecorated':<40}{base / NUMBER * 1e9:>10.0f} ns/call")
+    for squeeze_none in (False, True):
+        wrappers = {
+            "legacy": _legacy_inject(injected, squeeze_none=squeeze_none),
+            "plan": inject(injected, squeeze_none=squeeze_none),
+            "compiled": inject(injected, squeeze_none=squeeze_none, compiled=True),
+        }
+        for case, call in CASES.items():
+            for name, wrapper in wrappers.items():
+                cost = timeit.timeit(
+                    functools.partial(call, wrapper), number=NUMBER
+                )
+                label = f"{name} {case} (squeeze_none={squeeze_none})"
+                print(f"{label:<40}{cost / NUMBER * 1e9:>10.0f} ns/call")
+
+
+if __name__ == "__main__":
+    main()
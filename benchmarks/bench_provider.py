@@ -0,0 +1,39 @@
+"""
+micro-benchmark of `Provider.get`, with no override, with a global override and
+with a context-local override.
+
+    python benchmarks/bench_provider.py
+"""
+import timeit
+
+from simple_di.providers import Static
+
+NUMBER = 500000
+
+
+def main() -> None:
+    untouched = Static(1)
+    global_patched = Static(1)
+    local_patched = Static(1)
+    local_patched.set(2, local=True)
+    local_patched.reset()  # context-local overrides enabled, none active
+
+    cases = {
+        "no override": untouched.get,
+        "no override (local mode enabled)": local_patched.get,
+    }
+    for name, get in cases.items():
+        cost = timeit.timeit(get, number=NUMBER)
+        print(f"{name:<40}{cost / NUMBER * 1e9:>10.0f} ns/call")
+
+    with global_patched.patch(2):
+        cost = timeit.timeit(global_patched.get, number=NUMBER)
+    print(f"{'global override':<40}{cost / NUMBER * 1e9:>10.0f} ns/call")
+
+    with local_patched.patch(2, local=True):
+        cost = timeit.timeit(local_patched.get, number=NUMBER)
+    print(f"{'context-local override':<40}{cost / NUMBER * 1e9:>10.0f} ns/call")
+
+
+if __name__ == "__main__":
+    main()
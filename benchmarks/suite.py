@@ -0,0 +1,352 @@
+"""
+benchmark suite of the hot paths: injection, provider resolution, configuration
+reads, patching and state sync.
+
+    PYTHONPATH=. python benchmarks/suite.py --output results.json
+    PYTHONPATH=. python benchmarks/suite.py --baseline results.json --threshold 0.1
+
+results are saved as JSON, in nanoseconds per operation. When comparing against a
+baseline, the exit code is 1 if any benchmark is slower by more than the threshold.
+"""
+import argparse
+import dataclasses
+import json
+import pickle
+import platform
+import re
+import sys
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from simple_di import (
+    LazyProxy,
+    Provide,
+    Provider,
+    freeze,
+    inject,
+    snapshot,
+    sync_container,
+    unfreeze,
+)
+from simple_di.providers import Configuration, Factory, SingletonFactory, Static
+
+# a benchmark runs `number` operations and returns the seconds spent on them
+Benchmark = Callable[[int], float]
+
+
+def _loop(func: Callable[[], Any]) -> Benchmark:
+    def run(number: int) -> float:
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        return time.perf_counter() - start
+
+    return run
+
+
+def _injected_function(
+    count: int, squeeze_none: bool, compiled: bool = False
+) -> Callable[[], Any]:
+    provider = Static(1)
+    params = ", ".join(f"p{i}=Provide[provider]" for i in range(count))
+    namespace: Dict[str, Any] = {"Provide": Provide, "provider": provider}
+    exec(f"def func(a, {params}):\n    return a", namespace)
+    func = inject(namespace["func"], squeeze_none=squeeze_none, compiled=compiled)
+    return lambda: func(0)
+
+
+def bench_inject() -> Iterator[Tuple[str, Benchmark]]:
+    for count in (0, 1, 10):
+        for squeeze_none in (False, True):
+            name = f"inject/injected={count}/squeeze_none={squeeze_none}"
+            yield name, _loop(_injected_function(count, squeeze_none))
+        name = f"inject/compiled/injected={count}"
+        yield name, _loop(_injected_function(count, False, compiled=True))
+
+
+def bench_factory_chain() -> Iterator[Tuple[str, Benchmark]]:
+    for depth in (1, 10, 50):
+        provider: Provider[int] = Static(0)
+        for _ in range(depth):
+            provider = Factory(lambda v: v + 1, provider)
+        yield f"factory_chain/depth={depth}", _loop(provider.get)
+
+
+def _injected_step(provider: Provider[int]) -> Provider[int]:
+    def step(value: int = Provide[provider]) -> int:
+        return value + 1
+
+    return Factory(staticmethod(step))
+
+
+def bench_chain_inject() -> Iterator[Tuple[str, Benchmark]]:
+    for depth in (1, 10):
+        provider: Provider[int] = Static(0)
+        for _ in range(depth):
+            provider = _injected_step(provider)
+        yield f"chain_inject/depth={depth}", _loop(provider.get)
+
+
+def bench_snapshot() -> Iterator[Tuple[str, Benchmark]]:
+    source = _make_container(10)
+    params = ", ".join(f"p{i}=Provide[source.p{i}]" for i in range(10))
+    params += ", k=Provide[source.config.k0]"
+    namespace: Dict[str, Any] = {"Provide": Provide, "source": source}
+    exec(f"def func({params}):\n    return p0", namespace)
+    snap = snapshot(source)
+
+    yield "snapshot/inject/providers", _loop(inject(namespace["func"]))
+    yield "snapshot/inject/snapshot", _loop(inject(namespace["func"], snapshot=snap))
+    yield "snapshot/refresh/unchanged", _loop(snap.refresh)
+
+    def refresh_one() -> None:
+        source.p0.set(0)
+        snap.refresh()
+
+    yield "snapshot/refresh/one_changed", _loop(refresh_one)
+
+
+def bench_freeze() -> Iterator[Tuple[str, Benchmark]]:
+    source = _make_container(10)
+    params = ", ".join(f"p{i}=Provide[source.p{i}]" for i in range(10))
+    params += ", k=Provide[source.config.k0]"
+    namespace: Dict[str, Any] = {"Provide": Provide, "source": source}
+    exec(f"def func({params}):\n    return p0", namespace)
+    func = inject(namespace["func"])
+
+    def frozen(number: int) -> float:
+        freeze(source)
+        try:
+            return _loop(func)(number)
+        finally:
+            unfreeze(source)
+
+    yield "freeze/inject/providers", _loop(func)
+    yield "freeze/inject/frozen", frozen
+
+
+class _Heavy:
+    def __init__(self) -> None:
+        self.table = {i: str(i) for i in range(1000)}
+
+    def size(self) -> int:
+        return 1000
+
+
+def bench_lazy() -> Iterator[Tuple[str, Benchmark]]:
+    heavy = Factory(_Heavy)
+
+    @inject
+    def eager(h: _Heavy = Provide[heavy]) -> None:
+        pass
+
+    @inject
+    def lazy(h: _Heavy = Provide.lazy[heavy]) -> None:
+        pass
+
+    yield "lazy/untouched/eager", _loop(eager)
+    yield "lazy/untouched/lazy", _loop(lazy)
+
+    value = heavy.get()
+    proxy = LazyProxy(heavy)
+    proxy.size()
+    yield "lazy/access/direct", _loop(value.size)
+    yield "lazy/access/proxy", _loop(lambda: proxy.size())
+    yield "lazy/access/first", _loop(lambda: LazyProxy(heavy).size())
+
+
+def bench_singleton() -> Iterator[Tuple[str, Benchmark]]:
+    hot = SingletonFactory(object)
+    hot.get()
+    yield "singleton/hot", _loop(hot.get)
+
+    def cold(number: int) -> float:
+        providers = [SingletonFactory(object) for _ in range(number)]
+        start = time.perf_counter()
+        for provider in providers:
+            provider.get()
+        return time.perf_counter() - start
+
+    yield "singleton/cold", cold
+
+
+def bench_configuration() -> Iterator[Tuple[str, Benchmark]]:
+    for depth in (1, 5, 10):
+        data: Dict[Any, Any] = {"leaf": 1}
+        for i in reversed(range(depth - 1)):
+            data = {f"k{i}": data}
+        config = Configuration(data)
+        item: Any = config
+        for i in range(depth - 1):
+            item = item[f"k{i}"]
+        yield f"config/depth={depth}", _loop(item.leaf.get)
+
+        key: Provider[str] = Static("leaf")
+        yield f"config/depth={depth}/provider_key", _loop(item[key].get)
+
+    layered = Configuration({f"k{i}": {"leaf": i} for i in range(1000)})
+    for i in range(3):
+        layered.add_layer(f"layer{i}", {f"k{i}": {"leaf": -i}})
+    yield "config/layered", _loop(layered.k0.leaf.get)
+
+    def add_remove() -> None:
+        layered.add_layer("cli", {"k500": {"leaf": 0}})
+        layered.remove_layer("cli")
+
+    yield "config/layer/add_remove", _loop(add_remove)
+
+
+def bench_patch() -> Iterator[Tuple[str, Benchmark]]:
+    provider = Static(1)
+
+    def patch() -> None:
+        with provider.patch(2):
+            pass
+
+    def patch_local() -> None:
+        with provider.patch(2, local=True):
+            pass
+
+    yield "patch/global", _loop(patch)
+    yield "patch/local", _loop(patch_local)
+
+    config = Configuration({f"k{i}": {"leaf": i} for i in range(1000)})
+    leaf = config.k500.leaf
+
+    def patch_config_item() -> None:
+        with leaf.patch(-1):
+            pass
+
+    yield "patch/config_item", _loop(patch_config_item)
+
+
+def _make_container(size: int) -> Any:
+    fields: List[Tuple[str, Any, Any]] = [
+        (f"p{i}", Provider[int], dataclasses.field(default=Static(i)))
+        for i in range(size)
+    ]
+    fields.append(
+        (
+            "config",
+            Configuration,
+            dataclasses.field(
+                default=Configuration({f"k{i}": i for i in range(size)})
+            ),
+        )
+    )
+    name = f"Container{size}"
+    cls = dataclasses.make_dataclass(name, fields, frozen=True)
+    cls.__module__ = __name__  # picklable by reference
+    globals()[name] = cls
+    return cls()
+
+
+def bench_state() -> Iterator[Tuple[str, Benchmark]]:
+    for size in (10, 100, 1000):
+        source = _make_container(size)
+        payload = pickle.dumps(source)
+        target = pickle.loads(payload)
+
+        yield f"state/pickle/size={size}", _loop(lambda: pickle.dumps(source))
+        yield f"state/unpickle/size={size}", _loop(lambda: pickle.loads(payload))
+        yield f"state/sync_container/size={size}", _loop(
+            lambda: sync_container(target, source)
+        )
+
+
+SUITES = (
+    bench_inject,
+    bench_factory_chain,
+    bench_chain_inject,
+    bench_snapshot,
+    bench_freeze,
+    bench_lazy,
+    bench_singleton,
+    bench_configuration,
+    bench_patch,
+    bench_state,
+)
+
+
+def measure(benchmark: Benchmark, repeat: int, min_time: float) -> float:
+    """
+    calibrate the number of operations to run for at least `min_time` seconds, and
+    return the best nanoseconds per operation among `repeat` runs.
+    """
+    benchmark(1)  # one-time costs, such as caches and lazy imports, stay untimed
+    number = 1
+    while True:
+        elapsed = benchmark(number)
+        if elapsed >= min_time:
+            break
+        number *= 10 if elapsed < min_time / 10 else 2
+    best = elapsed
+    for _ in range(repeat - 1):
+        best = min(best, benchmark(number))
+    return best / number * 1e9
+
+
+def run(pattern: Optional[str], repeat: int, min_time: float) -> Dict[str, float]:
+    results: Dict[str, float] = {}
+    for suite in SUITES:
+        for name, benchmark in suite():
+            if pattern and not re.search(pattern, name):
+                continue
+            results[name] = measure(benchmark, repeat, min_time)
+            print(f"{name:<48}{results[name]:>12.0f} ns/op")
+    return results
+
+
+def compare(
+    results: Dict[str, float], baseline: Dict[str, float], threshold: float
+) -> List[str]:
+    """
+    print the ratio against the baseline, returning the benchmarks that regressed
+    """
+    regressions: List[str] = []
+    print(f"\n{'benchmark':<48}{'baseline':>12}{'current':>12}{'ratio':>8}")
+    for name, value in results.items():
+        if name not in baseline:
+            continue
+        ratio = value / baseline[name]
+        flag = ""
+        if ratio > 1 + threshold:
+            regressions.append(name)
+            flag = "  SLOWER"
+        print(f"{name:<48}{baseline[name]:>12.0f}{value:>12.0f}{ratio:>8.2f}{flag}")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("-k", dest="pattern", help="only run matching benchmarks")
+    parser.add_argument("--output", help="save the results to a JSON file")
+    parser.add_argument("--baseline", help="compare against saved JSON results")
+    parser.add_argument("--threshold", type=float, default=0.1)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.05)
+    args = parser.parse_args(argv)
+
+    results = run(args.pattern, args.repeat, args.min_time)
+    if args.output:
+        with open(args.output, "w", encoding="utf8") as f:
+            json.dump(
+                {
+                    "python": platform.python_version(),
+                    "implementation": platform.python_implementation(),
+                    "unit": "ns/op",
+                    "results": results,
+                },
+                f,
+                indent=2,
+            )
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf8") as f:
+            baseline = json.load(f)["results"]
+        if compare(results, baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -27,6 +27,7 @@ setuptools.setup(
     python_requires=">=3.6.1",
     install_requires=[
         'dataclasses; python_version < "3.7.0"',
+        'contextvars; python_version < "3.7.0"',
         'types-dataclasses; python_version < "3.7.0"',
     ],
     extras_require={"test": ["pytest", "mypy"]},
@@ -2,16 +2,24 @@
 A simple dependency injection framework
 """
 import contextlib
-import dataclasses
+import contextvars
 import functools
-import inspect
+import itertools
+import operator
+import sys
+import threading
+import time
+import weakref
 from typing import (
     TYPE_CHECKING,
     Any,
+    Awaitable,
     Callable,
     Dict,
     Generator,
     Generic,
+    List,
+    NamedTuple,
     Optional,
     Tuple,
     TypeVar,
@@ -20,13 +28,18 @@ from typing import (
     overload,
 )
 
-try:
-    from typing_extensions import GenericMeta  # type: ignore
-except ImportError:
+# `asyncio`, `dataclasses` and `inspect` are imported on first use, keeping the
+# cold import cheap for short-lived processes
+if TYPE_CHECKING or sys.version_info >= (3, 7):
     GenericMeta = type
+else:
+    try:
+        from typing_extensions import GenericMeta
+    except ImportError:
+        GenericMeta = type
 
 if TYPE_CHECKING:
-    GenericMeta = type
+    import inspect
 
 
 class _SentinelClass:
@@ -35,8 +48,153 @@ class _SentinelClass:
 
 sentinel = _SentinelClass()
 
+_local_lock = threading.Lock()
+
+_versions = itertools.count(1)
+
+_compact_pickling: "contextvars.ContextVar[bool]" = contextvars.ContextVar(
+    "simple_di_compact_pickling", default=False
+)
+
+
+@contextlib.contextmanager
+def compact_pickling() -> Generator[None, None, None]:
+    """
+    providers pickled within the context leave out their memorized values, which are
+    rebuilt on demand after unpickling, and configurations compress their data.
+    """
+    token = _compact_pickling.set(True)
+    try:
+        yield
+    finally:
+        _compact_pickling.reset(token)
+
+
+class ResolutionEvent:
+    """
+    a provider resolution or an injected call, reported to the installed hooks
+    """
+
+    __slots__ = ("name", "source", "depth", "duration", "error")
+
+    def __init__(self, name: str, source: str, depth: int) -> None:
+        self.name = name
+        # "override", "cache" or "factory" for providers, "call" for injected calls
+        self.source = source
+        self.depth = depth
+        self.duration = 0.0
+        self.error: Optional[BaseException] = None
+
+
+class ResolutionHook:
+    """
+    the base class of instrumentation hooks, see `install_hook`
+    """
+
+    def on_start(self, event: ResolutionEvent) -> Any:
+        """
+        called before resolving, the returned value is passed to `on_end`
+        """
+        return None
+
+    def on_end(self, event: ResolutionEvent, token: Any) -> None:
+        """
+        called after resolving, with the duration and the error raised if any
+        """
+
+
+# modified in place, so that modules importing it see the changes
+_hooks: List[ResolutionHook] = []
+_trace_depth: "contextvars.ContextVar[int]" = contextvars.ContextVar(
+    "simple_di_trace_depth", default=0
+)
+_tracing: "contextvars.ContextVar[Any]" = contextvars.ContextVar(
+    "simple_di_tracing", default=None
+)
+
+
+def install_hook(hook: ResolutionHook) -> None:
+    """
+    report provider resolutions and injected calls to `hook`. Hooks start in the
+    order they were installed, and end in reverse.
+    """
+    with _local_lock:
+        _hooks.append(hook)
+
+
+def remove_hook(hook: ResolutionHook) -> None:
+    with _local_lock:
+        _hooks[:] = [h for h in _hooks if h is not hook]
 
-class ProviderMeta(GenericMeta):  # type: ignore
+
+T = TypeVar("T")
+
+
+def _start_hooks(event: ResolutionEvent) -> List[Tuple[ResolutionHook, Any]]:
+    """
+    call `on_start` of the installed hooks, ending the ones already started if a
+    hook raises
+    """
+    started: List[Tuple[ResolutionHook, Any]] = []
+    try:
+        for hook in tuple(_hooks):
+            started.append((hook, hook.on_start(event)))
+    except BaseException as e:
+        event.error = e
+        _end_hooks(event, started)
+        raise
+    return started
+
+
+def _end_hooks(
+    event: ResolutionEvent, started: List[Tuple[ResolutionHook, Any]]
+) -> None:
+    # in reverse, so that hooks keeping stacks of state unwind them in order
+    for hook, token in reversed(started):
+        hook.on_end(event, token)
+
+
+def _trace(target: Any, call: Callable[[], T], name: str, source: str) -> T:
+    depth = _trace_depth.get()
+    event = ResolutionEvent(name, source, depth)
+    started = _start_hooks(event)
+    depth_token = _trace_depth.set(depth + 1)
+    tracing_token = _tracing.set(target)
+    start = time.perf_counter()
+    try:
+        return call()
+    except BaseException as e:
+        event.error = e
+        raise
+    finally:
+        event.duration = time.perf_counter() - start
+        _tracing.reset(tracing_token)
+        _trace_depth.reset(depth_token)
+        _end_hooks(event, started)
+
+
+async def _atrace(
+    target: Any, call: Callable[[], Awaitable[T]], name: str, source: str
+) -> T:
+    depth = _trace_depth.get()
+    event = ResolutionEvent(name, source, depth)
+    started = _start_hooks(event)
+    depth_token = _trace_depth.set(depth + 1)
+    tracing_token = _tracing.set(target)
+    start = time.perf_counter()
+    try:
+        return await call()
+    except BaseException as e:
+        event.error = e
+        raise
+    finally:
+        event.duration = time.perf_counter() - start
+        _tracing.reset(tracing_token)
+        _trace_depth.reset(depth_token)
+        _end_hooks(event, started)
+
+
+class ProviderMeta(GenericMeta):
     def __new__(
         mcs,
         class_name: str,
@@ -70,6 +228,24 @@ class Provider(Generic[VT], metaclass=ProviderMeta):
     """
 
     STATE_FIELDS: Tuple[str, ...] = ("_override",)
+    # state fields holding memorized values, left out by `compact_pickling`
+    MEMO_FIELDS: Tuple[str, ...] = ()
+
+    # created on the first context-local override, see `set` and `patch`
+    _local: "Optional[contextvars.ContextVar[Any]]" = None
+
+    # bumped whenever the value of this provider may have changed
+    _version = 0
+    # bumped whenever the fields in STATE_FIELDS of this provider changed
+    _state_version = 0
+    _dependents: "Optional[weakref.WeakSet[Provider[Any]]]" = None
+
+    # the field name, assigned by `container`
+    _name: Optional[str] = None
+    _frozen = False
+    _fork_policy: Optional[str] = None
+    # resolved with a key, could not be resolved as a whole
+    _keyed = False
 
     def __init__(self) -> None:
         self._override: Union[_SentinelClass, VT] = sentinel
@@ -77,55 +253,421 @@ class Provider(Generic[VT], metaclass=ProviderMeta):
     def _provide(self) -> VT:
         raise NotImplementedError
 
-    def set(self, value: Union[_SentinelClass, VT]) -> None:
+    def _describe(self) -> str:
+        return self._name or f"{type(self).__name__}@{id(self):x}"
+
+    def _is_cached(self) -> bool:
+        """
+        whether `_provide` would return a memorized value
+        """
+        return False
+
+    def _source(self) -> str:
+        if not isinstance(self._current_override(), _SentinelClass):
+            return "override"
+        return "cache" if self._is_cached() else "factory"
+
+    def _snapshot_value(self, values: Dict["Provider[Any]", Any]) -> Any:
+        """
+        the value of this provider in a snapshot holding `values`, or sentinel if it
+        is not part of it
+        """
+        return values.get(self, sentinel)
+
+    def _can_provide(self) -> bool:
+        """
+        whether `_provide` could be called here, given its dependencies could
+        """
+        return True
+
+    def _resolvable(self) -> bool:
+        """
+        whether `get` could resolve this provider as a whole, without a key, awaiting
+        or a scope
+        """
+        if self._keyed:
+            return False
+        if not isinstance(self._current_override(), _SentinelClass):
+            return True
+        if not self._can_provide():
+            return False
+        return self._is_cached() or all(
+            dep._resolvable() for dep in self._dependencies()
+        )
+
+    def _trace(self, call: Callable[[], T]) -> T:
+        return _trace(self, call, self._describe(), self._source())
+
+    async def _atrace(self, call: Callable[[], Awaitable[T]]) -> T:
+        return await _atrace(self, call, self._describe(), self._source())
+
+    def _dependencies(self) -> Tuple["Provider[Any]", ...]:
+        """
+        the providers this provider directly resolves values from
+        """
+        return ()
+
+    def _add_dependent(self, provider: "Provider[Any]") -> None:
+        if self._dependents is None:
+            self._dependents = weakref.WeakSet()
+        self._dependents.add(provider)
+
+    def _register_dependencies(self) -> None:
+        for dep in self._dependencies():
+            dep._add_dependent(self)
+
+    def _state_changed(self) -> None:
+        self._state_version = next(_versions)
+
+    def _changed(self) -> None:
+        """
+        bump the versions of this provider and notify the providers depending on it
+        """
+        self._state_version = next(_versions)
+        self._value_changed()
+
+    def _value_changed(self) -> None:
+        self._version = next(_versions)
+        if self._dependents:
+            for dependent in list(self._dependents):
+                dependent._upstream_changed()
+
+    def _upstream_changed(self) -> None:
+        self._value_changed()
+
+    def _frozen_value(self) -> Any:
+        """
+        the constant this provider resolves to once frozen, or sentinel if it could
+        not be frozen
         """
-        set the value to this provider, overriding the original values
+        return self._override
+
+    def _freeze(self) -> bool:
+        """
+        replace `get` and `aget` of this instance with ones returning the constant
+        """
+        value = self._frozen_value()
+        if isinstance(value, _SentinelClass):
+            return False
+
+        async def aget() -> Any:
+            return value
+
+        self.__dict__.update(
+            get=itertools.repeat(value).__next__, aget=aget, _frozen=True
+        )
+        return True
+
+    def _unfreeze(self) -> None:
+        for name in ("get", "aget", "_frozen"):
+            self.__dict__.pop(name, None)
+
+    def _drop_process_state(self) -> None:
+        """
+        drop the memorized values that should not be shared with a forked process
+        """
+        self._unfreeze()
+
+    def _check_not_frozen(self) -> None:
+        if self._frozen:
+            raise RuntimeError(
+                f"{self._describe()} is frozen, unfreeze the container to change it"
+            )
+
+    def _local_var(self) -> "contextvars.ContextVar[Any]":
+        if self._local is None:
+            with _local_lock:
+                if self._local is None:
+                    self._local = contextvars.ContextVar(
+                        f"simple_di_override_{id(self)}", default=sentinel
+                    )
+        return self._local
+
+    def _current_override(self) -> Union[_SentinelClass, VT]:
+        if self._local is not None:
+            value: Union[_SentinelClass, VT] = self._local.get()
+            if not isinstance(value, _SentinelClass):
+                return value
+        return self._override
+
+    def set(self, value: Union[_SentinelClass, VT], local: bool = False) -> None:
+        """
+        set the value to this provider, overriding the original values.
+        With `local=True` the value is only visible in the current context
+        (thread or asyncio task).
         """
         if isinstance(value, _SentinelClass):
             return
+        self._check_not_frozen()
+        if local:
+            self._local_var().set(value)
+            return
         self._override = value
+        self._changed()
 
     @contextlib.contextmanager
-    def patch(self, value: Union[_SentinelClass, VT]) -> Generator[None, None, None]:
+    def patch(
+        self, value: Union[_SentinelClass, VT], local: bool = False
+    ) -> Generator[None, None, None]:
         """
-        patch the value of this provider, restoring the original value after the context
+        patch the value of this provider, restoring the original value after the context.
+        With `local=True` the value is only visible in the current context
+        (thread or asyncio task).
         """
         if isinstance(value, _SentinelClass):
             yield
             return
+        self._check_not_frozen()
+        if local:
+            var = self._local_var()
+            token = var.set(value)
+            try:
+                yield
+            finally:
+                var.reset(token)
+            return
         original = self._override
         self._override = value
-        yield
-        self._override = original
+        self._changed()
+        try:
+            yield
+        finally:
+            self._override = original
+            self._changed()
 
     def get(self) -> VT:
         """
         get the value of this provider
         """
+        if _hooks and _tracing.get() is not self:
+            return self._trace(self.get)
+        if self._local is not None:
+            value: Union[_SentinelClass, VT] = self._local.get()
+            if not isinstance(value, _SentinelClass):
+                return value
         if not isinstance(self._override, _SentinelClass):
             return self._override
         return self._provide()
 
+    async def aget(self) -> VT:
+        """
+        get the value of this provider, awaiting it if the provider is asynchronous
+        """
+        return self.get()
+
     def reset(self) -> None:
         """
         remove the overriding and restore the original value
         """
+        self._check_not_frozen()
         self._override = sentinel
+        if self._local is not None:
+            self._local.set(sentinel)
+        self._changed()
 
     def __getstate__(self) -> Dict[str, Any]:
-        return {f: getattr(self, f) for f in self.STATE_FIELDS}
+        state = {f: getattr(self, f) for f in self.STATE_FIELDS}
+        if _compact_pickling.get():
+            for f in self.MEMO_FIELDS:
+                state[f] = sentinel
+        return state
 
     def __setstate__(self, state: Dict[str, Any]) -> None:
+        self._check_not_frozen()
         for i in self.STATE_FIELDS:
             setattr(self, i, state[i])
 
 
+def _resolve_proxy(proxy: "LazyProxy") -> Any:
+    value = _proxy_value(proxy)
+    if isinstance(value, _SentinelClass):
+        value = _proxy_provider(proxy).get()
+        object.__setattr__(proxy, "_value", value)
+    return value
+
+
+class LazyProxy:
+    """
+    stands for the value of a provider, resolving it on the first attribute access,
+    call, item access or operator, and forwarding to it afterwards. Operators return
+    plain values, so `proxy += 1` rebinds the name to the result
+    """
+
+    __slots__ = ("_provider", "_value")
+
+    def __init__(self, provider: Provider[Any]) -> None:
+        object.__setattr__(self, "_provider", provider)
+        object.__setattr__(self, "_value", sentinel)
+
+    def __getattribute__(self, name: str) -> Any:
+        value = _proxy_value(self)
+        if isinstance(value, _SentinelClass):
+            value = _resolve_proxy(self)
+        return getattr(value, name)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        setattr(_resolve_proxy(self), name, value)
+
+    def __delattr__(self, name: str) -> None:
+        delattr(_resolve_proxy(self), name)
+
+    def __call__(self, *args: Any, **kwargs: Any) -> Any:
+        return _resolve_proxy(self)(*args, **kwargs)
+
+    def __getitem__(self, key: Any) -> Any:
+        return _resolve_proxy(self)[key]
+
+    def __setitem__(self, key: Any, value: Any) -> None:
+        _resolve_proxy(self)[key] = value
+
+    def __contains__(self, item: Any) -> bool:
+        return item in _resolve_proxy(self)
+
+    def __iter__(self) -> Any:
+        return iter(_resolve_proxy(self))
+
+    def __len__(self) -> int:
+        return len(_resolve_proxy(self))
+
+    def __bool__(self) -> bool:
+        return bool(_resolve_proxy(self))
+
+    def __eq__(self, other: Any) -> bool:
+        return bool(_resolve_proxy(self) == other)
+
+    def __hash__(self) -> int:
+        return hash(_resolve_proxy(self))
+
+    def __str__(self) -> str:
+        return str(_resolve_proxy(self))
+
+    def __repr__(self) -> str:
+        value = _proxy_value(self)
+        if isinstance(value, _SentinelClass):
+            return f"<LazyProxy of {_proxy_provider(self)._describe()}>"
+        return repr(value)
+
+    def __enter__(self) -> Any:
+        return _resolve_proxy(self).__enter__()
+
+    def __exit__(self, *exc_info: Any) -> Any:
+        return _resolve_proxy(self).__exit__(*exc_info)
+
+    def __aenter__(self) -> Any:
+        return _resolve_proxy(self).__aenter__()
+
+    def __aexit__(self, *exc_info: Any) -> Any:
+        return _resolve_proxy(self).__aexit__(*exc_info)
+
+
+def _forwarding(func: Callable[..., Any], reflected: bool = False) -> Any:
+    def method(self: LazyProxy, *args: Any) -> Any:
+        return func(_resolve_proxy(self), *args)
+
+    def reflected_method(self: LazyProxy, other: Any) -> Any:
+        return func(other, _resolve_proxy(self))
+
+    return reflected_method if reflected else method
+
+
+# special methods are looked up on the type, bypassing __getattribute__
+_BINARY_OPS: Dict[str, Callable[[Any, Any], Any]] = {
+    "add": operator.add,
+    "sub": operator.sub,
+    "mul": operator.mul,
+    "matmul": operator.matmul,
+    "truediv": operator.truediv,
+    "floordiv": operator.floordiv,
+    "mod": operator.mod,
+    "pow": operator.pow,
+    "lshift": operator.lshift,
+    "rshift": operator.rshift,
+    "and": operator.and_,
+    "xor": operator.xor,
+    "or": operator.or_,
+}
+for _name, _op in _BINARY_OPS.items():
+    setattr(LazyProxy, f"__{_name}__", _forwarding(_op))
+    setattr(LazyProxy, f"__r{_name}__", _forwarding(_op, reflected=True))
+    setattr(LazyProxy, f"__i{_name}__", _forwarding(getattr(operator, f"i{_name}")))
+_FORWARDED_OPS: Dict[str, Callable[..., Any]] = {
+    "lt": operator.lt,
+    "le": operator.le,
+    "ne": operator.ne,
+    "gt": operator.gt,
+    "ge": operator.ge,
+    "divmod": divmod,
+    "neg": operator.neg,
+    "pos": operator.pos,
+    "abs": abs,
+    "invert": operator.invert,
+    "int": int,
+    "float": float,
+    "complex": complex,
+    "index": operator.index,
+    "round": round,
+    "format": format,
+    "bytes": bytes,
+    "reversed": reversed,
+}
+for _name, _op in _FORWARDED_OPS.items():
+    setattr(LazyProxy, f"__{_name}__", _forwarding(_op))
+setattr(LazyProxy, "__rdivmod__", _forwarding(divmod, reflected=True))
+del _name, _op
+
+
+# slot descriptors, reading the proxy itself without going through __getattribute__
+_proxy_value = cast(Callable[[LazyProxy], Any], getattr(LazyProxy, "_value").__get__)
+_proxy_provider = cast(
+    Callable[[LazyProxy], Provider[Any]], getattr(LazyProxy, "_provider").__get__
+)
+
+
+class _LazyProvider(Provider[Any]):
+    """
+    provides a `LazyProxy` of the wrapped provider
+    """
+
+    STATE_FIELDS: Tuple[str, ...] = Provider.STATE_FIELDS + ("_provider",)
+
+    def __init__(self, provider: Provider[Any]) -> None:
+        super().__init__()
+        self._provider = provider
+        self._register_dependencies()
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        super().__setstate__(state)
+        self._register_dependencies()
+
+    def _dependencies(self) -> Tuple[Provider[Any], ...]:
+        return (self._provider,)
+
+    def _describe(self) -> str:
+        return self._name or f"lazy {self._provider._describe()}"
+
+    def _snapshot_value(self, values: Dict[Provider[Any], Any]) -> Any:
+        return self._provider._snapshot_value(values)
+
+    def _provide(self) -> Any:
+        return LazyProxy(self._provider)
+
+
+class _LazyProvideClass:
+    def __getitem__(self, provider: Provider[VT]) -> VT:
+        return _LazyProvider(provider)  # type: ignore
+
+
 class _ProvideClass:
     """
     used as the default value of a injected functool/method. Would be replaced by the
     final value of the provider when this function/method gets called.
+
+    With `Provide.lazy[...]`, a `LazyProxy` is injected instead, only resolving the
+    provider when used.
     """
 
+    lazy = _LazyProvideClass()
+
     def __getitem__(self, provider: Provider[VT]) -> VT:
         return provider  # type: ignore
 
@@ -147,64 +689,412 @@ def _inject_kwargs(
 
 WrappedCallable = TypeVar("WrappedCallable", bound=Callable[..., Any])
 
+# (name, position, provider); position is None for keyword-only parameters
+_InjectionPlan = Tuple[Tuple[str, Optional[int], Provider[Any]], ...]
+
+
+def _compile_plan(sig: "inspect.Signature") -> Tuple[_InjectionPlan, Tuple[Any, ...]]:
+    """
+    analyse the signature once, returning the injected parameters that could be
+    passed by keyword, and the defaults of the positional-only parameters up to the
+    last injected one.
+    """
+    import inspect
+
+    plan: List[Tuple[str, Optional[int], Provider[Any]]] = []
+    positional_only: List[Any] = []
+    last_injected = 0
+    for position, param in enumerate(sig.parameters.values()):
+        if param.kind is param.POSITIONAL_ONLY:
+            positional_only.append(param.default)
+            if isinstance(param.default, Provider):
+                last_injected = position + 1
+        elif not isinstance(param.default, Provider):
+            continue
+        elif param.kind is param.POSITIONAL_OR_KEYWORD:
+            plan.append((param.name, position, param.default))
+        elif param.kind is param.KEYWORD_ONLY:
+            plan.append((param.name, None, param.default))
+    return tuple(plan), tuple(positional_only[:last_injected])
+
+
+def _bind_plan(
+    plan: _InjectionPlan, positional_defaults: Tuple[Any, ...], snapshot: Any
+) -> Tuple[Tuple[Tuple[str, Optional[int], Any], ...], _InjectionPlan, Tuple[Any, ...]]:
+    """
+    split the plan into the values found in the snapshot and the providers left to
+    resolve on each call
+    """
+    values = snapshot._values
+    bound: List[Tuple[str, Optional[int], Any]] = []
+    unbound: List[Tuple[str, Optional[int], Provider[Any]]] = []
+    for name, position, provider in plan:
+        value = provider._snapshot_value(values)
+        if isinstance(value, _SentinelClass):
+            unbound.append((name, position, provider))
+        else:
+            bound.append((name, position, value))
+    defaults = []
+    for default in positional_defaults:
+        if isinstance(default, Provider):
+            value = default._snapshot_value(values)
+            if not isinstance(value, _SentinelClass):
+                default = value
+        defaults.append(default)
+    return tuple(bound), tuple(unbound), tuple(defaults)
+
+
+def _missing_positional_only(
+    args: Tuple[Any, ...], defaults: Tuple[Any, ...]
+) -> Tuple[Any, ...]:
+    import inspect
+
+    tail = defaults[len(args) :]
+    for default in tail:
+        if default is inspect.Parameter.empty:
+            raise TypeError("missing a required positional-only argument")
+    return tail
+
+
+def _drop_not_passed(
+    args: Tuple[Any, ...], kwargs: Dict[str, Any], squeeze_none: bool
+) -> Tuple[Tuple[Any, ...], Dict[str, Any]]:
+    """
+    drop the arguments that should be treated as not passed
+    """
+    if squeeze_none:
+        return (
+            tuple(a for a in args if a is not None),
+            {k: v for k, v in kwargs.items() if v is not None},
+        )
+    return (
+        tuple(a for a in args if not isinstance(a, _SentinelClass)),
+        {k: v for k, v in kwargs.items() if not isinstance(v, _SentinelClass)},
+    )
+
+
+async def _ainject_args(
+    args: Tuple[Union[Provider[VT], Any], ...]
+) -> Tuple[Union[VT, Any], ...]:
+    indices = [i for i, a in enumerate(args) if isinstance(a, Provider)]
+    if not indices:
+        return args
+    import asyncio
+
+    values = list(args)
+    resolved = await asyncio.gather(*(args[i].aget() for i in indices))
+    for i, value in zip(indices, resolved):
+        values[i] = value
+    return tuple(values)
+
+
+async def _ainject_kwargs(
+    kwargs: Dict[str, Union[Provider[VT], Any]]
+) -> Dict[str, Union[VT, Any]]:
+    keys = [k for k, v in kwargs.items() if isinstance(v, Provider)]
+    if not keys:
+        return kwargs
+    import asyncio
+
+    values = dict(kwargs)
+    resolved = await asyncio.gather(*(kwargs[k].aget() for k in keys))
+    values.update(zip(keys, resolved))
+    return values
+
+
+class _NotPassedClass:
+    """
+    default of the injected parameters in generated wrappers
+    """
+
+    def __repr__(self) -> str:
+        return "<injected>"
+
+
+_not_passed = _NotPassedClass()
+
+
+def _resolve_var_args(args: Tuple[Any, ...], squeeze_none: bool) -> Tuple[Any, ...]:
+    args, _ = _drop_not_passed(args, {}, squeeze_none)
+    return _inject_args(args)
+
+
+def _resolve_var_kwargs(kwargs: Dict[str, Any], squeeze_none: bool) -> Dict[str, Any]:
+    _, kwargs = _drop_not_passed((), kwargs, squeeze_none)
+    return _inject_kwargs(kwargs)
+
+
+def _generate_wrapper(
+    func: Callable[..., Any],
+    sig: "inspect.Signature",
+    squeeze_none: bool,
+    snapshot: Optional[Any],
+) -> Optional[Callable[..., Any]]:
+    """
+    generate a wrapper with the parameters of `func`, the injected ones defaulting
+    to a private sentinel and resolved inline. Returns None if the parameter names
+    clash with the names used by the generated code.
+    """
+    params = list(sig.parameters.values())
+    if any(p.name.startswith("_di_") for p in params):
+        return None
+    values = snapshot._values if snapshot is not None else None
+    namespace: Dict[str, Any] = {
+        "_di_func": func,
+        "_di_np": _not_passed,
+        "_di_skip": type(None) if squeeze_none else _SentinelClass,
+        "_di_provider": Provider,
+        "_di_squeeze": squeeze_none,
+        "_di_hooks": _hooks,
+        "_di_tracing": _tracing,
+        "_di_trace": _trace,
+        "_di_partial": functools.partial,
+        "_di_name": getattr(func, "__qualname__", repr(func)),
+        "_di_var_args": _resolve_var_args,
+        "_di_var_kwargs": _resolve_var_kwargs,
+    }
+    last_positional_only = max(
+        (i for i, p in enumerate(params) if p.kind is p.POSITIONAL_ONLY), default=-1
+    )
+    signature: List[str] = []
+    call: List[str] = []
+    body: List[str] = []
+    keyword_only = False
+    for i, param in enumerate(params):
+        name = param.name
+        if param.kind is param.VAR_POSITIONAL:
+            keyword_only = True
+            signature.append(f"*{name}")
+            call.append(f"*{name}")
+            body.append(f"    if {name}:")
+            body.append(f"        {name} = _di_var_args({name}, _di_squeeze)")
+            continue
+        if param.kind is param.VAR_KEYWORD:
+            signature.append(f"**{name}")
+            call.append(f"**{name}")
+            body.append(f"    if {name}:")
+            body.append(f"        {name} = _di_var_kwargs({name}, _di_squeeze)")
+            continue
+        if param.kind is param.KEYWORD_ONLY and not keyword_only:
+            keyword_only = True
+            signature.append("*")
+
+        default = param.default
+        if isinstance(default, Provider):
+            value = sentinel if values is None else default._snapshot_value(values)
+            if isinstance(value, _SentinelClass):
+                namespace[f"_di_p{i}"] = default
+                resolve = f"_di_p{i}.get()"
+            else:
+                namespace[f"_di_v{i}"] = value
+                resolve = f"_di_v{i}"
+            signature.append(f"{name}=_di_np")
+            body.append(f"    if {name} is _di_np or isinstance({name}, _di_skip):")
+            body.append(f"        {name} = {resolve}")
+            body.append(f"    elif isinstance({name}, _di_provider):")
+        elif default is param.empty:
+            namespace[f"_di_m{i}"] = (
+                f"{namespace['_di_name']}() missing required argument: {name!r}"
+            )
+            signature.append(name)
+            body.append(f"    if isinstance({name}, _di_skip):")
+            body.append(f"        raise TypeError(_di_m{i})")
+            body.append(f"    elif isinstance({name}, _di_provider):")
+        else:
+            namespace[f"_di_d{i}"] = default
+            signature.append(f"{name}=_di_d{i}")
+            body.append(f"    if isinstance({name}, _di_skip):")
+            body.append(f"        {name} = _di_d{i}")
+            body.append(f"    elif isinstance({name}, _di_provider):")
+        body.append(f"        {name} = {name}.get()")
+
+        if i == last_positional_only:
+            signature.append("/")
+        call.append(f"{name}={name}" if param.kind is param.KEYWORD_ONLY else name)
 
-def _inject(func: WrappedCallable, squeeze_none: bool) -> WrappedCallable:
+    params_source = ", ".join(signature)
+    call_source = ", ".join(call)
+    source = "\n".join(
+        [
+            f"def _di_wrapper({params_source}):",
+            "    if _di_hooks and _di_tracing.get() is not _di_wrapper:",
+            "        return _di_trace(",
+            "            _di_wrapper,",
+            f"            _di_partial(_di_wrapper, {call_source}),",
+            "            _di_name,",
+            '            "call",',
+            "        )",
+            *body,
+            f"    return _di_func({call_source})",
+        ]
+    )
+    exec(source, namespace)
+    wrapper: Callable[..., Any] = namespace["_di_wrapper"]
+    return wrapper
+
+
+def _inject(
+    func: WrappedCallable,
+    squeeze_none: bool,
+    snapshot: Optional[Any] = None,
+    compiled: bool = False,
+) -> WrappedCallable:
     if getattr(func, "_is_injected", False):
-        return func
+        if snapshot is None and not compiled:
+            return func
+        func = getattr(func, "__wrapped__")
+
+    import inspect
 
     sig = inspect.signature(func)
+    if compiled and not inspect.iscoroutinefunction(func):
+        generated = _generate_wrapper(func, sig, squeeze_none, snapshot)
+        if generated is not None:
+            wrapper = functools.wraps(func)(generated)
+            setattr(wrapper, "_is_injected", True)
+            return cast(WrappedCallable, wrapper)
+
+    plan, positional_defaults = _compile_plan(sig)
+    bound: Tuple[Tuple[str, Optional[int], Any], ...] = ()
+    if snapshot is not None:
+        bound, plan, positional_defaults = _bind_plan(
+            plan, positional_defaults, snapshot
+        )
+    special = type(None) if squeeze_none else _SentinelClass
+    qualname = getattr(func, "__qualname__", repr(func))
+
+    def _needs_filter(args: Tuple[Any, ...], kwargs: Dict[str, Any]) -> bool:
+        for a in args:
+            if isinstance(a, (special, Provider)):
+                return True
+        for v in kwargs.values():
+            if isinstance(v, (special, Provider)):
+                return True
+        return False
+
+    if inspect.iscoroutinefunction(func):
+        import asyncio
+
+        @functools.wraps(func)
+        async def _async(
+            *args: Optional[Union[Any, _SentinelClass]],
+            **kwargs: Optional[Union[Any, _SentinelClass]]
+        ) -> Any:
+            if _hooks and _tracing.get() is not _async:
+                return await _atrace(
+                    _async, lambda: _async(*args, **kwargs), qualname, "call"
+                )
+            if _needs_filter(args, kwargs):
+                args, kwargs = _drop_not_passed(args, kwargs, squeeze_none)
+                args, kwargs = await asyncio.gather(
+                    _ainject_args(args), _ainject_kwargs(kwargs)
+                )
+
+            num_args = len(args)
+            for name, position, value in bound:
+                if name in kwargs or (position is not None and position < num_args):
+                    continue
+                kwargs[name] = value
+            missing = [
+                (name, provider)
+                for name, position, provider in plan
+                if name not in kwargs and (position is None or position >= num_args)
+            ]
+            if missing:
+                values = await asyncio.gather(*(p.aget() for _, p in missing))
+                kwargs.update(zip((name for name, _ in missing), values))
+            if num_args < len(positional_defaults):
+                tail = _missing_positional_only(args, positional_defaults)
+                args = args + await _ainject_args(tail)
+
+            return await func(*args, **kwargs)
+
+        setattr(_async, "_is_injected", True)
+        return cast(WrappedCallable, _async)
 
     @functools.wraps(func)
     def _(
         *args: Optional[Union[Any, _SentinelClass]],
         **kwargs: Optional[Union[Any, _SentinelClass]]
     ) -> Any:
-        if not squeeze_none:
-            filtered_args = tuple(a for a in args if not isinstance(a, _SentinelClass))
-            filtered_kwargs = {
-                k: v for k, v in kwargs.items() if not isinstance(v, _SentinelClass)
-            }
-        else:
-            filtered_args = tuple(a for a in args if a is not None)
-            filtered_kwargs = {k: v for k, v in kwargs.items() if v is not None}
+        if _hooks and _tracing.get() is not _:
+            return _trace(_, lambda: _(*args, **kwargs), qualname, "call")
+        if _needs_filter(args, kwargs):
+            args, kwargs = _drop_not_passed(args, kwargs, squeeze_none)
+            args, kwargs = _inject_args(args), _inject_kwargs(kwargs)
 
-        bind = sig.bind_partial(*filtered_args, **filtered_kwargs)
-        bind.apply_defaults()
+        num_args = len(args)
+        for name, position, value in bound:
+            if name in kwargs or (position is not None and position < num_args):
+                continue
+            kwargs[name] = value
+        for name, position, provider in plan:
+            if name in kwargs or (position is not None and position < num_args):
+                continue
+            kwargs[name] = provider.get()
+        if num_args < len(positional_defaults):
+            tail = _missing_positional_only(args, positional_defaults)
+            args = args + _inject_args(tail)
 
-        return func(*_inject_args(bind.args), **_inject_kwargs(bind.kwargs))
+        return func(*args, **kwargs)
 
     setattr(_, "_is_injected", True)
     return cast(WrappedCallable, _)
 
 
 @overload
-def inject(func: WrappedCallable, squeeze_none: bool = False) -> WrappedCallable:
+def inject(
+    func: WrappedCallable,
+    squeeze_none: bool = False,
+    snapshot: Optional["ContainerSnapshot"] = None,
+    compiled: bool = False,
+) -> WrappedCallable:
     ...
 
 
 @overload
 def inject(
-    func: None = None, squeeze_none: bool = False
+    func: None = None,
+    squeeze_none: bool = False,
+    snapshot: Optional["ContainerSnapshot"] = None,
+    compiled: bool = False,
 ) -> Callable[[WrappedCallable], WrappedCallable]:
     ...
 
 
 def inject(
-    func: Optional[WrappedCallable] = None, squeeze_none: bool = False
+    func: Optional[WrappedCallable] = None,
+    squeeze_none: bool = False,
+    snapshot: Optional["ContainerSnapshot"] = None,
+    compiled: bool = False,
 ) -> Union[WrappedCallable, Callable[[WrappedCallable], WrappedCallable]]:
     """
     used with `Provide`, inject values to provided defaults of the decorated
     function/method when gets called.
+
+    With `snapshot`, the providers in the snapshot are bound to their values in it,
+    and the others are still resolved on each call.
+
+    With `compiled`, the wrapper is generated with the parameters of the function,
+    avoiding the generic argument handling. A `skip` (or None with `squeeze_none`)
+    argument then stands for its own parameter, replaced by its default or provider,
+    or raising TypeError if the parameter is required, where the generic wrapper
+    drops it and shifts the following positional arguments. Coroutine functions keep
+    the generic wrapper, resolving the injected values concurrently.
     """
     if func is None:
-        wrapper = functools.partial(_inject, squeeze_none=squeeze_none)
+        wrapper = functools.partial(
+            _inject, squeeze_none=squeeze_none, snapshot=snapshot, compiled=compiled
+        )
         return cast(Callable[[WrappedCallable], WrappedCallable], wrapper)
 
     if isinstance(func, type):
         raise TypeError("`inject` SHOULD not be used with class.")
 
     if callable(func):
-        return _inject(func, squeeze_none=squeeze_none)
+        return _inject(
+            func, squeeze_none=squeeze_none, snapshot=snapshot, compiled=compiled
+        )
 
     raise ValueError("You must pass either None or Callable.")
 
@@ -213,6 +1103,8 @@ def sync_container(from_: Any, to_: Any) -> None:
     """
     sync container states from `from_` to `to_`
     """
+    import dataclasses
+
     for field in dataclasses.fields(to_):
         src = field.default
         target = getattr(from_, field.name, None)
@@ -220,11 +1112,202 @@ def sync_container(from_: Any, to_: Any) -> None:
             continue
         if isinstance(src, Provider):
             src.__setstate__(target.__getstate__())
+            src._changed()
         elif dataclasses.is_dataclass(src):
             sync_container(src, target)
 
 
-container = dataclasses.dataclass(frozen=True)
+class ContainerDelta(NamedTuple):
+    """
+    the states of the providers in a container that changed since a version
+    """
+
+    version: int
+    states: Dict[str, Dict[str, Any]]
+
+
+def _iter_container_providers(
+    container_: Any, prefix: str = ""
+) -> Generator[Tuple[str, Provider[Any]], None, None]:
+    import dataclasses
+
+    for field in dataclasses.fields(container_):
+        value = getattr(container_, field.name, None)
+        name = prefix + field.name
+        if isinstance(value, Provider):
+            yield name, value
+        elif dataclasses.is_dataclass(value):
+            yield from _iter_container_providers(value, name + ".")
+
+
+def container_delta(from_: Any, since: int = 0) -> ContainerDelta:
+    """
+    collect the states of the providers in `from_` that changed after version
+    `since`. Pass the `version` of the returned delta as `since` of the next call
+    to only get the following changes.
+    """
+    version = next(_versions)
+    states = {
+        name: provider.__getstate__()
+        for name, provider in _iter_container_providers(from_)
+        if provider._state_version > since
+    }
+    return ContainerDelta(version=version, states=states)
+
+
+def apply_container_delta(to_: Any, delta: ContainerDelta) -> None:
+    """
+    apply the states collected by `container_delta` to the container `to_`
+    """
+    if not delta.states:
+        return
+    for name, provider in _iter_container_providers(to_):
+        state = delta.states.get(name)
+        if state is not None:
+            provider.__setstate__(state)
+            provider._changed()
+
+
+class ContainerSnapshot:
+    """
+    frozen view of the values of the providers in a container, read as plain
+    attributes. Nested containers are nested snapshots, and providers that could not
+    be resolved synchronously here (resolved with a key, awaited, scoped or not set)
+    are kept as is. `refresh` returns a new snapshot, only resolving again the
+    providers that changed.
+    """
+
+    _container: Any
+    _names: Tuple[str, ...]
+    # name -> (provider, version when resolved)
+    _entries: Dict[str, Tuple[Provider[Any], int]]
+    _values: Dict[Provider[Any], Any]
+
+    def __init__(self, container_: Any, *fields: str) -> None:
+        import dataclasses
+
+        names = fields or tuple(f.name for f in dataclasses.fields(container_))
+        self._build(container_, names, None)
+
+    def _build(
+        self,
+        container_: Any,
+        names: Tuple[str, ...],
+        previous: Optional["ContainerSnapshot"],
+    ) -> None:
+        import dataclasses
+
+        attrs: Dict[str, Any] = {}
+        entries: Dict[str, Tuple[Provider[Any], int]] = {}
+        values: Dict[Provider[Any], Any] = {}
+        for name in names:
+            value = getattr(container_, name)
+            if isinstance(value, Provider) and value._resolvable():
+                version = value._version
+                entry = previous._entries.get(name) if previous else None
+                if entry is not None and entry[0] is value and entry[1] == version:
+                    resolved = previous.__dict__[name]
+                else:
+                    resolved = value.get()
+                entries[name] = (value, version)
+                values[value] = resolved
+                value = resolved
+            elif dataclasses.is_dataclass(value) and not isinstance(value, type):
+                nested = previous.__dict__.get(name) if previous else None
+                if isinstance(nested, ContainerSnapshot):
+                    value = nested.refresh()
+                else:
+                    value = ContainerSnapshot(value)
+                values.update(value._values)
+            attrs[name] = value
+        self.__dict__.update(attrs)
+        self.__dict__.update(
+            _container=container_, _names=names, _entries=entries, _values=values
+        )
+
+    def _is_stale(self) -> bool:
+        for provider, version in self._entries.values():
+            if provider._version != version:
+                return True
+        for name in self._names:
+            value = self.__dict__[name]
+            if isinstance(value, ContainerSnapshot) and value._is_stale():
+                return True
+            if isinstance(value, Provider) and value._resolvable():
+                return True  # kept as a provider, could be resolved now
+        return False
+
+    def refresh(self) -> "ContainerSnapshot":
+        """
+        a snapshot of the same container and fields, reusing the values of the
+        providers that did not change. Returns this snapshot if none changed.
+        """
+        if not self._is_stale():
+            return self
+        refreshed = object.__new__(ContainerSnapshot)
+        refreshed._build(self._container, self._names, self)
+        return refreshed
+
+    def __getattr__(self, name: str) -> Any:
+        raise AttributeError(f"{name} is not in the snapshot")
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError("container snapshots are read-only")
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError("container snapshots are read-only")
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{n}={self.__dict__[n]!r}" for n in self._names)
+        return f"ContainerSnapshot({fields})"
+
+
+def snapshot(container_: Any, *fields: str) -> ContainerSnapshot:
+    """
+    resolve the providers of the container, or only of the named fields, into a
+    frozen view read as plain attributes
+    """
+    return ContainerSnapshot(container_, *fields)
+
+
+def freeze(container_: Any) -> List[str]:
+    """
+    turn the providers of the container that could not change anymore into
+    constants: overridden or `set` providers, `Static`, `Configuration` and its
+    items, and the singletons already built. Frozen providers skip overrides and
+    resolution hooks, and raise on `set`, `patch` and `reset` until `unfreeze`.
+    Returns the names of the frozen providers.
+    """
+    return [
+        name
+        for name, provider in _iter_container_providers(container_)
+        if provider._freeze()
+    ]
+
+
+def unfreeze(container_: Any) -> None:
+    """
+    restore the providers frozen by `freeze`
+    """
+    for _, provider in _iter_container_providers(container_):
+        provider._unfreeze()
+
+
+ContainerType = TypeVar("ContainerType", bound=type)
+
+
+def container(cls: ContainerType) -> ContainerType:
+    """
+    turn the class into a frozen dataclass holding providers, naming the providers
+    after their fields
+    """
+    import dataclasses
+
+    frozen: type = dataclasses.dataclass(frozen=True)(cls)
+    for field in dataclasses.fields(frozen):
+        if isinstance(field.default, Provider) and field.default._name is None:
+            field.default._name = f"{frozen.__name__}.{field.name}"
+    return cast(ContainerType, frozen)
 
 
 skip = not_passed = sentinel
@@ -233,8 +1316,21 @@ __all__ = [
     "container",
     "Provider",
     "Provide",
+    "LazyProxy",
     "inject",
     "not_passed",
     "skip",
     "sync_container",
+    "compact_pickling",
+    "ResolutionEvent",
+    "ResolutionHook",
+    "install_hook",
+    "remove_hook",
+    "ContainerDelta",
+    "container_delta",
+    "apply_container_delta",
+    "ContainerSnapshot",
+    "snapshot",
+    "freeze",
+    "unfreeze",
 ]
@@ -0,0 +1,311 @@
+"""
+Instrumentation hooks for provider resolution and injected calls
+"""
+import collections
+import contextlib
+import contextvars
+import functools
+import json
+import threading
+from typing import (
+    Any,
+    Callable,
+    Deque,
+    Dict,
+    Generator,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+    cast,
+)
+
+from simple_di import ResolutionEvent, ResolutionHook, install_hook, remove_hook
+
+__all__ = ["ResolutionStats", "TracingHook", "ResolutionProfiler", "instrumented"]
+
+
+@contextlib.contextmanager
+def instrumented(hook: ResolutionHook) -> Generator[ResolutionHook, None, None]:
+    """
+    install `hook` within the context
+    """
+    install_hook(hook)
+    try:
+        yield hook
+    finally:
+        remove_hook(hook)
+
+
+def _percentile(ordered: List[float], percent: float) -> float:
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, round(percent / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class _Stats:
+    __slots__ = ("count", "total", "errors", "sources", "samples")
+
+    def __init__(self, max_samples: int) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.errors = 0
+        self.sources: Dict[str, int] = collections.defaultdict(int)
+        self.samples: Deque[float] = collections.deque(maxlen=max_samples)
+
+
+class ResolutionStats(ResolutionHook):
+    """
+    in-memory aggregator of counts, durations and sources by provider or function
+    name. Percentiles are computed from the latest `max_samples` durations.
+    """
+
+    def __init__(self, max_samples: int = 1024) -> None:
+        self._max_samples = max_samples
+        self._lock = threading.Lock()
+        self._stats: Dict[str, _Stats] = {}
+
+    def on_end(self, event: ResolutionEvent, token: Any) -> None:
+        with self._lock:
+            stats = self._stats.get(event.name)
+            if stats is None:
+                stats = self._stats[event.name] = _Stats(self._max_samples)
+            stats.count += 1
+            stats.total += event.duration
+            stats.sources[event.source] += 1
+            stats.samples.append(event.duration)
+            if event.error is not None:
+                stats.errors += 1
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats.clear()
+
+    def summary(
+        self, percentiles: Tuple[float, ...] = (50, 90, 99)
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        returns the aggregated statistics by name, durations in seconds
+        """
+        with self._lock:
+            items = [
+                (name, s.count, s.total, s.errors, dict(s.sources), sorted(s.samples))
+                for name, s in self._stats.items()
+            ]
+        summary: Dict[str, Dict[str, Any]] = {}
+        for name, count, total, errors, sources, ordered in items:
+            resolved = sources.get("cache", 0) + sources.get("factory", 0)
+            summary[name] = {
+                "count": count,
+                "total": total,
+                "mean": total / count,
+                "errors": errors,
+                "sources": sources,
+                "cache_hit_rate": sources.get("cache", 0) / resolved
+                if resolved
+                else None,
+                **{f"p{p:g}": _percentile(ordered, p) for p in percentiles},
+            }
+        return summary
+
+
+class TracingHook(ResolutionHook):
+    """
+    open a span for each resolution with an OpenTelemetry-style tracer, which
+    provides `start_as_current_span(name, attributes=...)`. Nested resolutions become
+    child spans.
+    """
+
+    def __init__(self, tracer: Any, prefix: str = "simple_di") -> None:
+        self._tracer = tracer
+        self._prefix = prefix
+
+    def on_start(self, event: ResolutionEvent) -> Any:
+        manager = self._tracer.start_as_current_span(
+            event.name,
+            attributes={
+                f"{self._prefix}.source": event.source,
+                f"{self._prefix}.depth": event.depth,
+            },
+        )
+        span = manager.__enter__()
+        return manager, span
+
+    def on_end(self, event: ResolutionEvent, token: Any) -> None:
+        manager, span = token
+        span.set_attribute(f"{self._prefix}.duration", event.duration)
+        error = event.error
+        if error is None:
+            manager.__exit__(None, None, None)
+        else:
+            manager.__exit__(type(error), error, error.__traceback__)
+
+
+class _Node:
+    __slots__ = ("name", "source", "parent", "duration", "children")
+
+    def __init__(self, name: str, source: str, parent: Optional["_Node"]) -> None:
+        self.name = name
+        self.source = source
+        self.parent = parent
+        self.duration = 0.0
+        self.children: List["_Node"] = []
+
+    def signature(self) -> Tuple[Any, ...]:
+        return (self.name, tuple(c.signature() for c in self.children))
+
+    def self_time(self) -> float:
+        return max(0.0, self.duration - sum(c.duration for c in self.children))
+
+
+class _MergedNode:
+    __slots__ = ("name", "count", "total", "self_total", "sources", "children")
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.count = 0
+        self.total = 0.0
+        self.self_total = 0.0
+        self.sources: Dict[str, int] = collections.defaultdict(int)
+        self.children: Dict[str, "_MergedNode"] = {}
+
+    def merge(self, node: _Node) -> None:
+        self.count += 1
+        self.total += node.duration
+        self.self_total += node.self_time()
+        self.sources[node.source] += 1
+        for child in node.children:
+            merged = self.children.get(child.name)
+            if merged is None:
+                merged = self.children[child.name] = _MergedNode(child.name)
+            merged.merge(child)
+
+    def folded(self, prefix: str, lines: List[str]) -> None:
+        stack = f"{prefix};{self.name}" if prefix else self.name
+        lines.append(f"{stack} {round(self.self_total * 1e6)}")
+        for child in self.children.values():
+            child.folded(stack, lines)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "count": self.count,
+            "total": self.total,
+            "self": self.self_total,
+            "sources": dict(self.sources),
+            "children": [c.to_dict() for c in self.children.values()],
+        }
+
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+class ResolutionProfiler(ResolutionHook):
+    """
+    record the tree of nested resolutions of each injected call or top level
+    resolution, used as a context manager or a decorator. Identical paths are merged
+    across calls, and could be exported as folded stacks for flame graphs or JSON.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._active = 0
+        self._roots: Dict[str, _MergedNode] = {}
+        self._trees: Dict[Tuple[Any, ...], int] = collections.defaultdict(int)
+        self._redundant: Dict[str, int] = collections.defaultdict(int)
+        # the node being resolved, per profiler so that profilers active together
+        # keep their own trees
+        self._node: "contextvars.ContextVar[Optional[_Node]]" = contextvars.ContextVar(
+            f"simple_di_profile_node_{id(self)}", default=None
+        )
+
+    def __enter__(self) -> "ResolutionProfiler":
+        with self._lock:
+            self._active += 1
+            if self._active == 1:
+                install_hook(self)
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        with self._lock:
+            self._active -= 1
+            if self._active == 0:
+                remove_hook(self)
+
+    def __call__(self, func: F) -> F:
+        @functools.wraps(func)
+        def _(*args: Any, **kwargs: Any) -> Any:
+            with self:
+                return func(*args, **kwargs)
+
+        return cast(F, _)
+
+    def on_start(self, event: ResolutionEvent) -> Any:
+        node = _Node(event.name, event.source, self._node.get())
+        return node, self._node.set(node)
+
+    def on_end(self, event: ResolutionEvent, token: Any) -> None:
+        node, node_token = token
+        node.duration = event.duration
+        self._node.reset(node_token)
+        if node.parent is not None:
+            node.parent.children.append(node)
+        else:
+            self._record(node)
+
+    def _record(self, root: _Node) -> None:
+        built: Dict[str, int] = collections.defaultdict(int)
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            if node.source == "factory":
+                built[node.name] += 1
+            stack.extend(node.children)
+        with self._lock:
+            merged = self._roots.get(root.name)
+            if merged is None:
+                merged = self._roots[root.name] = _MergedNode(root.name)
+            merged.merge(root)
+            self._trees[root.signature()] += 1
+            for name, count in built.items():
+                if count > 1:
+                    self._redundant[name] += count - 1
+
+    def redundant(self) -> Dict[str, int]:
+        """
+        providers built more than once within a single tree, with the number of
+        extra builds across all the recorded trees
+        """
+        with self._lock:
+            return dict(self._redundant)
+
+    def folded(self) -> str:
+        """
+        the merged trees as folded stacks with self time in microseconds, the input
+        format of flamegraph.pl and speedscope
+        """
+        lines: List[str] = []
+        with self._lock:
+            for root in self._roots.values():
+                root.folded("", lines)
+        return "\n".join(lines) + "\n" if lines else ""
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "roots": [r.to_dict() for r in self._roots.values()],
+                "trees": [
+                    {"signature": signature, "count": count}
+                    for signature, count in self._trees.items()
+                ],
+                "redundant": dict(self._redundant),
+            }
+
+    def write_folded(self, path: str) -> None:
+        with open(path, "w", encoding="utf8") as f:
+            f.write(self.folded())
+
+    def write_json(self, path: str) -> None:
+        with open(path, "w", encoding="utf8") as f:
+            json.dump(self.to_dict(), f, indent=2)
@@ -0,0 +1,444 @@
+"""
+Container lifecycle helpers
+"""
+import asyncio
+import gc
+import os
+import threading
+import time
+import weakref
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    Type,
+    TypeVar,
+    Union,
+    cast,
+)
+
+from simple_di import Provider, _iter_container_providers
+from simple_di.providers import Resource, SingletonFactory
+
+__all__ = [
+    "warmup",
+    "shutdown",
+    "ashutdown",
+    "shareable",
+    "per_process",
+    "prefork",
+]
+
+_Graph = Dict[Provider[Any], Set[Provider[Any]]]
+
+P = TypeVar("P", bound=Provider[Any])
+T = TypeVar("T")
+
+_SHAREABLE = "shareable"
+_PER_PROCESS = "per_process"
+
+_per_process: "weakref.WeakSet[Provider[Any]]" = weakref.WeakSet()
+_fork_hook_lock = threading.Lock()
+_fork_hook_registered = False
+
+
+def _collect_targets(container: Any, kind: Type[Any]) -> Dict[Provider[Any], str]:
+    targets: Dict[Provider[Any], str] = {}
+    for name, provider in _iter_container_providers(container):
+        if isinstance(provider, kind):
+            targets.setdefault(provider, name)
+    return targets
+
+
+def _collect_dependencies(
+    provider: Provider[Any], targets: Dict[Provider[Any], str]
+) -> Set[Provider[Any]]:
+    """
+    find the targets `provider` depends on, looking through the providers that are
+    not targets themselves.
+    """
+    found: Set[Provider[Any]] = set()
+    visited: Set[Provider[Any]] = set()
+    stack = list(provider._dependencies())
+    while stack:
+        dep = stack.pop()
+        if dep in visited:
+            continue
+        visited.add(dep)
+        if dep in targets:
+            found.add(dep)
+        else:
+            stack.extend(dep._dependencies())
+    return found
+
+
+def _dependency_graph(targets: Dict[Provider[Any], str]) -> Tuple[_Graph, _Graph]:
+    """
+    returns the dependencies and the dependents of each target
+    """
+    dependencies = {p: _collect_dependencies(p, targets) for p in targets}
+    dependents: _Graph = {p: set() for p in targets}
+    for provider, deps in dependencies.items():
+        for dep in deps:
+            dependents[dep].add(provider)
+    return dependencies, dependents
+
+
+def _check_circular(targets: Dict[Provider[Any], str], finished: Set[str]) -> None:
+    if len(finished) < len(targets):
+        circular = sorted(n for n in targets.values() if n not in finished)
+        raise RuntimeError(f"circular dependencies among {', '.join(circular)}")
+
+
+class _DaemonExecutor:
+    """
+    runs each task on its own daemon thread, at most `max_workers` at once, so that
+    abandoned tasks do not keep the interpreter from exiting
+    """
+
+    def __init__(self, max_workers: Optional[int] = None) -> None:
+        self._slots = threading.Semaphore(max_workers) if max_workers else None
+
+    def submit(self, func: Callable[..., T], *args: Any) -> "Future[T]":
+        future: "Future[T]" = Future()
+
+        def run() -> None:
+            if self._slots is not None:
+                self._slots.acquire()
+            try:
+                if not future.set_running_or_notify_cancel():
+                    return
+                try:
+                    result = func(*args)
+                except BaseException as e:
+                    future.set_exception(e)
+                else:
+                    future.set_result(result)
+            finally:
+                if self._slots is not None:
+                    self._slots.release()
+
+        threading.Thread(target=run, name="simple_di-teardown", daemon=True).start()
+        return future
+
+    def shutdown(self, wait: bool = True) -> None:
+        pass  # the threads are not joined
+
+
+def _timed(func: Callable[[], Any]) -> float:
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def _run_in_order(
+    targets: Dict[Provider[Any], str],
+    waits_for: _Graph,
+    unblocks: _Graph,
+    task: Callable[[Provider[Any]], Any],
+    max_workers: Optional[int],
+    timeout: Optional[float] = None,
+    stop_on_error: bool = True,
+    daemon: bool = False,
+) -> Tuple[Dict[str, float], Dict[str, BaseException]]:
+    """
+    run `task` on each target in a thread pool, or on daemon threads, once all the
+    targets it waits for have finished
+    """
+    remaining = {p: len(deps) for p, deps in waits_for.items()}
+    timings: Dict[str, float] = {}
+    errors: Dict[str, BaseException] = {}
+    deadlines: Dict["Future[float]", float] = {}
+    pending: Dict["Future[float]", Provider[Any]] = {}
+    executor: Union[ThreadPoolExecutor, _DaemonExecutor]
+    if daemon:
+        executor = _DaemonExecutor(max_workers=max_workers)
+    else:
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    def submit(provider: Provider[Any]) -> None:
+        future = executor.submit(_timed, lambda: task(provider))
+        pending[future] = provider
+        if timeout is not None:
+            deadlines[future] = time.monotonic() + timeout
+
+    def finish(provider: Provider[Any]) -> None:
+        for next_provider in unblocks[provider]:
+            remaining[next_provider] -= 1
+            if remaining[next_provider] == 0:
+                submit(next_provider)
+
+    try:
+        for provider, count in remaining.items():
+            if count == 0:
+                submit(provider)
+        while pending:
+            wait_timeout = None
+            if deadlines:
+                wait_timeout = max(0.0, min(deadlines.values()) - time.monotonic())
+            done, _ = wait(pending, timeout=wait_timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                now = time.monotonic()
+                done = {f for f, deadline in deadlines.items() if deadline <= now}
+            for future in done:
+                provider = pending.pop(future)
+                deadlines.pop(future, None)
+                name = targets[provider]
+                error: Optional[BaseException] = TimeoutError(f"{name} timed out")
+                if future.done():
+                    error = future.exception()
+                if error is not None:
+                    errors[name] = error
+                else:
+                    timings[name] = future.result()
+                if name in errors and stop_on_error:
+                    raise errors[name]
+                finish(provider)
+    except BaseException:
+        for future in pending:
+            future.cancel()
+        raise
+    finally:
+        executor.shutdown(wait=stop_on_error)
+    return timings, errors
+
+
+def _needs_await(provider: Provider[Any]) -> bool:
+    """
+    whether the provider is, or depends on, an async resource
+    """
+    visited: Set[Provider[Any]] = set()
+    stack = [provider]
+    while stack:
+        dep = stack.pop()
+        if dep in visited:
+            continue
+        visited.add(dep)
+        if isinstance(dep, Resource) and dep.is_async:
+            return True
+        stack.extend(dep._dependencies())
+    return False
+
+
+def warmup(container: Any, max_workers: Optional[int] = None) -> Dict[str, float]:
+    """
+    eagerly build the singletons of a container, building the independent ones in
+    parallel in a thread pool and the others after their dependencies. Async
+    resources and the singletons depending on them are left to be built with `aget`.
+
+    returns the seconds spent on building each singleton, keyed by field name.
+    """
+    targets = {
+        provider: name
+        for provider, name in _collect_targets(container, SingletonFactory).items()
+        if not _needs_await(provider)
+    }
+    dependencies, dependents = _dependency_graph(targets)
+    timings, _ = _run_in_order(
+        targets,
+        dependencies,
+        dependents,
+        lambda p: p.get(),
+        max_workers=max_workers,
+    )
+    _check_circular(targets, set(timings))
+    return timings
+
+
+def shareable(provider: P) -> P:
+    """
+    tag the provider as safe to build before forking, its value is shared by the
+    forked processes copy-on-write. Built by `prefork`.
+    """
+    if provider._fork_policy == _PER_PROCESS:
+        raise ValueError(f"{provider._describe()} is tagged as per process")
+    provider._fork_policy = _SHAREABLE
+    return provider
+
+
+def per_process(provider: P) -> P:
+    """
+    tag the provider as not safe to share with forked processes (sockets, thread
+    pools, locks...). Its memorized value, and the ones of the providers depending
+    on it, are dropped in the child after `os.fork`.
+    """
+    global _fork_hook_registered
+
+    if provider._fork_policy == _SHAREABLE:
+        raise ValueError(f"{provider._describe()} is tagged as shareable")
+    provider._fork_policy = _PER_PROCESS
+    _per_process.add(provider)
+    if not _fork_hook_registered and hasattr(os, "register_at_fork"):
+        with _fork_hook_lock:
+            if not _fork_hook_registered:
+                os.register_at_fork(after_in_child=_after_fork_in_child)
+                _fork_hook_registered = True
+    return provider
+
+
+def _after_fork_in_child() -> None:
+    """
+    drop the values of the per process providers and of all the providers depending
+    on them
+    """
+    visited: Set[Provider[Any]] = set()
+    stack: List[Provider[Any]] = list(_per_process)
+    while stack:
+        provider = stack.pop()
+        if provider in visited:
+            continue
+        visited.add(provider)
+        provider._drop_process_state()
+        if provider._dependents:
+            stack.extend(provider._dependents)
+    for provider in visited:
+        provider._changed()
+
+
+def _depends_on_per_process(provider: Provider[Any]) -> bool:
+    visited: Set[Provider[Any]] = set()
+    stack = list(provider._dependencies())
+    while stack:
+        dep = stack.pop()
+        if dep in visited:
+            continue
+        visited.add(dep)
+        if dep._fork_policy == _PER_PROCESS:
+            return True
+        stack.extend(dep._dependencies())
+    return False
+
+
+def prefork(
+    container: Any, max_workers: Optional[int] = None, freeze_gc: bool = True
+) -> Dict[str, float]:
+    """
+    build the singletons tagged as `shareable` before forking the workers, in
+    parallel like `warmup`. With `freeze_gc`, the objects alive are then moved to
+    the permanent generation of the garbage collector (Python 3.7+), so collections
+    in the workers don't write to the shared pages.
+
+    returns the seconds spent on building each singleton, keyed by field name.
+    """
+    targets = {
+        provider: name
+        for provider, name in _collect_targets(container, SingletonFactory).items()
+        if provider._fork_policy == _SHAREABLE
+    }
+    unsafe = sorted(n for p, n in targets.items() if _depends_on_per_process(p))
+    if unsafe:
+        raise ValueError(f"{', '.join(unsafe)} depend on per process providers")
+    dependencies, dependents = _dependency_graph(targets)
+    timings, _ = _run_in_order(
+        targets,
+        dependencies,
+        dependents,
+        lambda p: p.get(),
+        max_workers=max_workers,
+    )
+    _check_circular(targets, set(timings))
+    if freeze_gc and hasattr(gc, "freeze"):
+        gc.collect()
+        gc.freeze()
+    return timings
+
+
+def _raise_errors(errors: Dict[str, BaseException]) -> None:
+    if errors:
+        names = ", ".join(sorted(errors))
+        raise RuntimeError(f"failed to shut down {names}") from next(
+            iter(errors.values())
+        )
+
+
+def shutdown(
+    container: Any,
+    timeout: Optional[float] = None,
+    max_workers: Optional[int] = None,
+) -> Dict[str, float]:
+    """
+    tear down the resources of a container, each one after the resources depending
+    on it. Independent teardowns run in parallel on daemon threads, and a teardown
+    taking longer than `timeout` seconds is abandoned, left running in its thread
+    without keeping the interpreter from exiting.
+
+    returns the seconds spent on each teardown, keyed by field name. Failed or timed
+    out teardowns are raised together after all the others have finished.
+    """
+    targets = _collect_targets(container, Resource)
+    dependencies, dependents = _dependency_graph(targets)
+    timings, errors = _run_in_order(
+        targets,
+        dependents,
+        dependencies,
+        lambda p: cast(Resource[Any], p).shutdown(),
+        max_workers=max_workers,
+        timeout=timeout,
+        stop_on_error=False,
+        daemon=True,
+    )
+    _raise_errors(errors)
+    _check_circular(targets, set(timings))
+    return timings
+
+
+async def ashutdown(
+    container: Any, timeout: Optional[float] = None
+) -> Dict[str, float]:
+    """
+    the asyncio version of `shutdown`, awaiting the teardown of async generator
+    resources. Teardowns of the other resources run on daemon threads.
+    """
+    targets = _collect_targets(container, Resource)
+    dependencies, dependents = _dependency_graph(targets)
+    remaining = {p: len(deps) for p, deps in dependents.items()}
+    timings: Dict[str, float] = {}
+    errors: Dict[str, BaseException] = {}
+    loop = asyncio.get_event_loop()
+    executor = _DaemonExecutor()
+
+    async def teardown(provider: Resource[Any]) -> float:
+        start = time.perf_counter()
+        coro: Awaitable[None]
+        if provider.is_async:
+            coro = provider.ashutdown()
+        else:
+            coro = asyncio.wrap_future(executor.submit(provider.shutdown), loop=loop)
+        await asyncio.wait_for(coro, timeout)
+        return time.perf_counter() - start
+
+    pending: Dict["asyncio.Future[float]", Provider[Any]] = {}
+
+    def submit(provider: Provider[Any]) -> None:
+        future = asyncio.ensure_future(teardown(cast(Resource[Any], provider)))
+        pending[future] = provider
+
+    for provider, count in remaining.items():
+        if count == 0:
+            submit(provider)
+    while pending:
+        done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for future in done:
+            provider = pending.pop(future)
+            name = targets[provider]
+            error = future.exception()
+            if isinstance(error, asyncio.TimeoutError):
+                error = TimeoutError(f"{name} timed out")
+            if error is not None:
+                errors[name] = error
+            else:
+                timings[name] = future.result()
+            for dep in dependencies[provider]:
+                remaining[dep] -= 1
+                if remaining[dep] == 0:
+                    submit(dep)
+
+    _raise_errors(errors)
+    _check_circular(targets, set(timings))
+    return timings
@@ -1,22 +1,50 @@
 """
 Provider implementations
 """
-import importlib
-from types import LambdaType, ModuleType
+import collections
+import contextlib
+import contextvars
+import sys
+import threading
+import time
+from types import AsyncGeneratorType, GeneratorType, LambdaType
 from typing import Any
 from typing import Callable as CallableType
-from typing import Dict, NoReturn, Tuple, Union
+from typing import (
+    TYPE_CHECKING,
+    AsyncGenerator,
+    Awaitable,
+    Dict,
+    Generator,
+    List,
+    NoReturn,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+    cast,
+)
 
 from simple_di import (
     VT,
     Provider,
+    _ainject_args,
+    _ainject_kwargs,
     _inject_args,
     _inject_kwargs,
+    _compact_pickling,
+    _hooks,
     _SentinelClass,
+    _trace,
+    _tracing,
+    _versions,
     inject,
     sentinel,
 )
 
+if TYPE_CHECKING:
+    import asyncio
+
 __all__ = [
     "Placeholder",
     "Static",
@@ -24,6 +52,14 @@ __all__ = [
     "MemoizedCallable",
     "Factory",
     "SingletonFactory",
+    "ReactiveFactory",
+    "ThreadLocalSingleton",
+    "FamilyFactory",
+    "ScopedFactory",
+    "scope",
+    "Resource",
+    "AsyncFactory",
+    "AsyncSingletonFactory",
     "Configuration",
     "ConfigDictType",
 ]
@@ -37,6 +73,9 @@ class Placeholder(Provider[VT]):
     def _provide(self) -> NoReturn:
         raise RuntimeError("Placeholder cannot be get before set")
 
+    def _can_provide(self) -> bool:
+        return False
+
 
 class Static(Provider[VT]):
     """
@@ -52,24 +91,73 @@ class Static(Provider[VT]):
     def _provide(self) -> VT:
         return self._value
 
+    def _frozen_value(self) -> Any:
+        if not isinstance(self._override, _SentinelClass):
+            return self._override
+        return self._value
+
+
+_REGISTRY_NAME = "__simple_di__"
+_registry_lock = threading.Lock()
+
+
+class _AnonymousRegistry:
+    """
+    namespace of a module holding its anonymous factories under unique names, so
+    that they could be pickled by reference as `__simple_di__.<name>`. The names
+    end with `__<count>`, which neither the attributes of the registry nor other
+    registered names could take.
+    """
+
+    def __init__(self, module_name: str) -> None:
+        self._module_name = module_name
+        self._counts: Dict[str, int] = {}
+        self._funcs: Dict[str, Any] = {}
+
+    def __reduce__(self) -> Tuple[Any, ...]:
+        return _module_registry, (self._module_name,)
+
+    def __getattr__(self, name: str) -> Any:
+        if name in ("_module_name", "_counts", "_funcs"):
+            raise AttributeError()
+        try:
+            return self._funcs[name]
+        except KeyError:
+            raise AttributeError(name) from None
 
-def _probe_unique_name(module: ModuleType, origin_name: str) -> str:
-    name = "__simple_di_" + origin_name.replace(".", "_").replace("<lambda>", "lambda")
-    num = 0
-    while hasattr(module, f"{name}{num or ''}"):
-        num += 1
-    return f"{name}{num or ''}"
+    def register(self, func: Any) -> str:
+        base = func.__qualname__.replace("<lambda>", "lambda")
+        base = "".join(c if c.isalnum() else "_" for c in base)
+        num = self._counts.get(base, 0)
+        self._counts[base] = num + 1
+        name = f"{base}__{num}"
+        self._funcs[name] = func
+        return name
+
+
+def _module_registry(module_name: str) -> _AnonymousRegistry:
+    import importlib
+
+    module = importlib.import_module(module_name)
+    return cast(_AnonymousRegistry, getattr(module, _REGISTRY_NAME))
 
 
 def _patch_anonymous(func: Any) -> None:
     module_name = func.__module__
-    origin_name = func.__qualname__
+    module = sys.modules.get(module_name)
+    if module is None:
+        import importlib
 
-    module = importlib.import_module(module_name)
-    name = _probe_unique_name(module, origin_name)
-    func.__qualname__ = name
+        module = importlib.import_module(module_name)
+
+    with _registry_lock:
+        registry = vars(module).get(_REGISTRY_NAME)
+        if registry is None:
+            registry = _AnonymousRegistry(module_name)
+            setattr(module, _REGISTRY_NAME, registry)
+        name = registry.register(func)
+    func.__qualname__ = f"{_REGISTRY_NAME}.{name}"
     func.__name__ = name
-    setattr(module, name, func)
 
 
 class Factory(Provider[VT]):
@@ -83,6 +171,7 @@ class Factory(Provider[VT]):
         "_func",
         "_chain_inject",
     )
+    _injected: Optional[CallableType[..., VT]] = None
 
     def __init__(self, func: CallableType[..., VT], *args: Any, **kwargs: Any) -> None:
         super().__init__()
@@ -98,14 +187,51 @@ class Factory(Provider[VT]):
             func = func.__func__
             _patch_anonymous(func)
         self._func: CallableType[..., VT] = func
+        self._register_dependencies()
 
-    def _provide(self) -> VT:
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        super().__setstate__(state)
+        self._injected = None
+        self._register_dependencies()
+
+    def _target(self) -> CallableType[..., VT]:
+        """
+        the callable to call, static methods are injected once and the wrapper is
+        reused, it's rebuilt lazily after unpickling
+        """
+        if not self._chain_inject:
+            return self._func
+        injected = self._injected
+        if injected is None:
+            injected = self._injected = inject(self._func)
+        return injected
+
+    def _dependencies(self) -> Tuple[Provider[Any], ...]:
+        deps = [a for a in self._args if isinstance(a, Provider)]
+        deps.extend(v for v in self._kwargs.values() if isinstance(v, Provider))
         if self._chain_inject:
-            return inject(self._func)(
-                *_inject_args(self._args),
-                **_inject_kwargs(self._kwargs),
+            import inspect
+
+            deps.extend(
+                p.default
+                for p in inspect.signature(self._func).parameters.values()
+                if isinstance(p.default, Provider)
             )
-        return self._func(*_inject_args(self._args), **_inject_kwargs(self._kwargs))
+        return tuple(deps)
+
+    async def _acall(self) -> Any:
+        """
+        call the function with the providers in the arguments resolved concurrently
+        """
+        import asyncio
+
+        args, kwargs = await asyncio.gather(
+            _ainject_args(self._args), _ainject_kwargs(self._kwargs)
+        )
+        return self._target()(*args, **kwargs)
+
+    def _provide(self) -> VT:
+        return self._target()(*_inject_args(self._args), **_inject_kwargs(self._kwargs))
 
 
 class SingletonFactory(Factory[VT]):
@@ -114,32 +240,773 @@ class SingletonFactory(Factory[VT]):
     """
 
     STATE_FIELDS: Tuple[str, ...] = Factory.STATE_FIELDS + ("_cache",)
+    MEMO_FIELDS: Tuple[str, ...] = ("_cache",)
 
     def __init__(self, func: CallableType[..., VT], *args: Any, **kwargs: Any) -> None:
         super().__init__(func, *args, **kwargs)
         self._cache: Union[_SentinelClass, VT] = sentinel
+        self._lock = threading.RLock()
+
+    def _provide(self) -> VT:
+        cache = self._cache
+        if not isinstance(cache, _SentinelClass):
+            return cache
+        with self._lock:
+            # double-checked: another thread may have built it while we waited
+            if not isinstance(self._cache, _SentinelClass):
+                return self._cache
+            value = super()._provide()
+            self._cache = value
+            self._state_changed()
+            return value
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        super().__setstate__(state)
+        self._lock = threading.RLock()
+
+    def _is_cached(self) -> bool:
+        return not isinstance(self._cache, _SentinelClass)
+
+    def _upstream_changed(self) -> None:
+        pass  # the memorized value is kept until reset
+
+    def _frozen_value(self) -> Any:
+        if not isinstance(self._override, _SentinelClass):
+            return self._override
+        return self._cache
+
+    def _drop_process_state(self) -> None:
+        super()._drop_process_state()
+        self._cache = sentinel
+        self._lock = threading.RLock()  # could be held by a thread that is gone
+
+
+class AsyncFactory(Factory[VT]):
+    """
+    provider that returns the result of a callable or a coroutine function, which
+    could only be resolved with `aget`. Providers in the arguments are resolved
+    concurrently.
+    """
+
+    def __init__(
+        self,
+        func: CallableType[..., Union[VT, Awaitable[VT]]],
+        *args: Any,
+        **kwargs: Any
+    ) -> None:
+        super().__init__(cast(CallableType[..., VT], func), *args, **kwargs)
+
+    def _provide(self) -> VT:
+        raise RuntimeError("AsyncFactory cannot be get synchronously, use aget")
+
+    def _can_provide(self) -> bool:
+        return False
+
+    async def _aprovide(self) -> VT:
+        import inspect
+
+        value = await self._acall()
+        if inspect.isawaitable(value):
+            value = await value
+        return cast(VT, value)
+
+    async def aget(self) -> VT:
+        if _hooks and _tracing.get() is not self:
+            return await self._atrace(self.aget)
+        override = self._current_override()
+        if not isinstance(override, _SentinelClass):
+            return override
+        return await self._aprovide()
+
+
+class AsyncSingletonFactory(AsyncFactory[VT]):
+    """
+    provider that returns the result of a callable or a coroutine function, but
+    memorize the returns. Concurrent tasks share the same pending build.
+    """
+
+    STATE_FIELDS: Tuple[str, ...] = AsyncFactory.STATE_FIELDS + ("_cache",)
+    MEMO_FIELDS: Tuple[str, ...] = ("_cache",)
+
+    _pending: "Optional[asyncio.Future[VT]]" = None
+
+    def __init__(
+        self,
+        func: CallableType[..., Union[VT, Awaitable[VT]]],
+        *args: Any,
+        **kwargs: Any
+    ) -> None:
+        super().__init__(func, *args, **kwargs)
+        self._cache: Union[_SentinelClass, VT] = sentinel
+
+    def _frozen_value(self) -> Any:
+        if not isinstance(self._override, _SentinelClass):
+            return self._override
+        return self._cache
+
+    def _drop_process_state(self) -> None:
+        super()._drop_process_state()
+        self._cache = sentinel
+        self._pending = None
 
     def _provide(self) -> VT:
         if not isinstance(self._cache, _SentinelClass):
             return self._cache
+        return super()._provide()
+
+    def _is_cached(self) -> bool:
+        return not isinstance(self._cache, _SentinelClass)
+
+    def _can_provide(self) -> bool:
+        return self._is_cached()
+
+    def _upstream_changed(self) -> None:
+        pass  # the memorized value is kept until reset
+
+    async def _build(self) -> VT:
+        try:
+            value = await super()._aprovide()
+            self._cache = value
+            self._state_changed()
+            return value
+        finally:
+            self._pending = None
+
+    async def _aprovide(self) -> VT:
+        if not isinstance(self._cache, _SentinelClass):
+            return self._cache
+        import asyncio
+
+        if self._pending is None:
+            self._pending = asyncio.ensure_future(self._build())
+        return await asyncio.shield(self._pending)
+
+
+class ReactiveFactory(Factory[VT]):
+    """
+    provider that returns the result of a callable, memorizing it until any of the
+    upstream providers is set, reset or patched. Context-local overrides of the
+    upstream providers are not tracked.
+    """
+
+    _memo: Optional[Tuple[int, VT]] = None
+
+    def _is_cached(self) -> bool:
+        return self._memo is not None and self._memo[0] == self._version
+
+    def _drop_process_state(self) -> None:
+        super()._drop_process_state()
+        self._memo = None
+
+    def _provide(self) -> VT:
+        version = self._version
+        memo = self._memo
+        if memo is not None and memo[0] == version:
+            return memo[1]
         value = super()._provide()
-        self._cache = value
+        self._memo = (version, value)
+        return value
+
+
+class ThreadLocalSingleton(Factory[VT]):
+    """
+    provider that returns the result of a callable, but memorize the returns for
+    each thread.
+    """
+
+    def __init__(self, func: CallableType[..., VT], *args: Any, **kwargs: Any) -> None:
+        super().__init__(func, *args, **kwargs)
+        self._thread_local = threading.local()
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        super().__setstate__(state)
+        self._thread_local = threading.local()
+
+    def _upstream_changed(self) -> None:
+        pass  # the memorized values are kept until reset
+
+    def _is_cached(self) -> bool:
+        return hasattr(self._thread_local, "value")
+
+    def _drop_process_state(self) -> None:
+        super()._drop_process_state()
+        self._thread_local = threading.local()
+
+    def _provide(self) -> VT:
+        value: Union[_SentinelClass, VT] = getattr(self._thread_local, "value", sentinel)
+        if not isinstance(value, _SentinelClass):
+            return value
+        value = super()._provide()
+        self._thread_local.value = value
+        return value
+
+
+class FamilyFactory(Factory[VT]):
+    """
+    provider of a family of values, one per key, built by calling the callable with
+    the key followed by the other arguments. Values are memorized per key, keeping
+    at most `maxsize` of them (least recently used are evicted first) for at most
+    `ttl` seconds. `on_evict(key, value)` is called with the evicted values.
+
+    Resolved with `get(key)`, or addressed as a provider with `family[key]`, where
+    the key could also be a provider.
+    """
+
+    STATE_FIELDS: Tuple[str, ...] = Factory.STATE_FIELDS + (
+        "_maxsize",
+        "_ttl",
+        "_on_evict",
+    )
+
+    _members: Optional[Dict[Any, "_FamilyMember[VT]"]] = None
+    _keyed = True
+
+    def __init__(
+        self,
+        func: CallableType[..., VT],
+        *args: Any,
+        maxsize: Optional[int] = None,
+        ttl: Optional[float] = None,
+        on_evict: Optional[CallableType[[Any, VT], Any]] = None,
+        **kwargs: Any
+    ) -> None:
+        super().__init__(func, *args, **kwargs)
+        self._maxsize = maxsize
+        self._ttl = ttl
+        self._on_evict = on_evict
+        self._init_cache()
+
+    def _init_cache(self) -> None:
+        # key -> (value, expiry time)
+        self._cache: "collections.OrderedDict[Any, Tuple[VT, float]]" = (
+            collections.OrderedDict()
+        )
+        self._lock = threading.Lock()
+        self._key_locks: Dict[Any, threading.Lock] = {}
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        super().__setstate__(state)
+        self._init_cache()
+
+    def _upstream_changed(self) -> None:
+        pass  # the memorized values are kept until cleared
+
+    def _freeze(self) -> bool:
+        return False  # resolved with a key
+
+    def _drop_process_state(self) -> None:
+        super()._drop_process_state()
+        self._init_cache()  # the values are released by the parent
+
+    def _cached(
+        self, key: Any, evicted: List[Tuple[Any, VT]]
+    ) -> Union[_SentinelClass, VT]:
+        """
+        the memorized value of the key, moving it to `evicted` if expired. Called with
+        the lock, `on_evict` being called with the evicted values after releasing it.
+        """
+        entry = self._cache.get(key)
+        if entry is None:
+            return sentinel
+        value, expiry = entry
+        if self._ttl is not None and expiry <= time.monotonic():
+            del self._cache[key]
+            evicted.append((key, value))
+            return sentinel
+        self._cache.move_to_end(key)
         return value
 
+    def _evicted(self, entries: List[Tuple[Any, VT]]) -> None:
+        if self._on_evict is not None:
+            for key, value in entries:
+                self._on_evict(key, value)
+
+    def _build(self, key: Any) -> VT:
+        func = self._target()
+        return func(key, *_inject_args(self._args), **_inject_kwargs(self._kwargs))
+
+    def get(self, key: Any = sentinel) -> VT:
+        """
+        get the value of the key, building it once if not memorized
+        """
+        if isinstance(key, _SentinelClass):
+            raise TypeError("FamilyFactory.get requires a key")
+        override = self._current_override()
+        if not isinstance(override, _SentinelClass):
+            if _hooks and _tracing.get() is not self:
+                return self._trace(lambda: self.get(key))
+            return override
+
+        evicted: List[Tuple[Any, VT]] = []
+        key_lock: Optional[threading.Lock] = None
+        with self._lock:
+            value = self._cached(key, evicted)
+            if isinstance(value, _SentinelClass):
+                key_lock = self._key_locks.setdefault(key, threading.Lock())
+        if _hooks and _tracing.get() is not self:
+            # the source of the key, as the family is never memorized as a whole
+            source = "factory" if key_lock is not None else "cache"
+            return _trace(
+                self,
+                lambda: self._resolve_key(key, value, key_lock, evicted),
+                self._describe(),
+                source,
+            )
+        return self._resolve_key(key, value, key_lock, evicted)
+
+    def _resolve_key(
+        self,
+        key: Any,
+        value: Union[_SentinelClass, VT],
+        key_lock: Optional[threading.Lock],
+        evicted: List[Tuple[Any, VT]],
+    ) -> VT:
+        """
+        the value of the key, given the memorized value found by `get` or the lock to
+        build it with
+        """
+        try:
+            if key_lock is not None:
+                with key_lock:
+                    with self._lock:
+                        value = self._cached(key, evicted)
+                    if isinstance(value, _SentinelClass):
+                        value = self._build_cached(key, evicted)
+        finally:
+            self._evicted(evicted)
+        return cast(VT, value)
+
+    def _key_source(self, key: Any) -> str:
+        """
+        the source `get(key)` would resolve the key from
+        """
+        if not isinstance(self._current_override(), _SentinelClass):
+            return "override"
+        with self._lock:
+            entry = self._cache.get(key)
+        if entry is None or self._ttl is not None and entry[1] <= time.monotonic():
+            return "factory"
+        return "cache"
+
+    def _build_cached(self, key: Any, evicted: List[Tuple[Any, VT]]) -> VT:
+        """
+        build and memorize the value of the key. Called with the lock of the key.
+        """
+        try:
+            value = self._build(key)
+        except BaseException:
+            with self._lock:
+                self._key_locks.pop(key, None)
+            raise
+        expiry = time.monotonic() + self._ttl if self._ttl is not None else 0.0
+        with self._lock:
+            self._cache[key] = (value, expiry)
+            self._key_locks.pop(key, None)
+            while self._maxsize is not None and len(self._cache) > self._maxsize:
+                old_key, (old_value, _) = self._cache.popitem(last=False)
+                evicted.append((old_key, old_value))
+        self._state_changed()
+        return value
+
+    def _provide(self) -> VT:
+        raise TypeError("FamilyFactory.get requires a key")
+
+    def keys(self) -> List[Any]:
+        """
+        the keys of the memorized values, least recently used first
+        """
+        with self._lock:
+            return list(self._cache)
+
+    def evict(self, key: Any) -> None:
+        """
+        drop the memorized value of the key
+        """
+        with self._lock:
+            entry = self._cache.pop(key, None)
+        if entry is not None:
+            self._state_changed()
+            self._evicted([(key, entry[0])])
+
+    def purge(self) -> None:
+        """
+        drop the expired values
+        """
+        if self._ttl is None:
+            return
+        now = time.monotonic()
+        with self._lock:
+            expired = [(k, v) for k, (v, e) in self._cache.items() if e <= now]
+            for key, _ in expired:
+                del self._cache[key]
+        self._evicted(expired)
+
+    def clear(self) -> None:
+        """
+        drop all the memorized values
+        """
+        with self._lock:
+            entries = [(k, v) for k, (v, _) in self._cache.items()]
+            self._cache.clear()
+        if entries:
+            self._state_changed()
+        self._evicted(entries)
+
+    def __getitem__(self, key: Any) -> "_FamilyMember[VT]":
+        members = self._members
+        if members is None:
+            members = self._members = {}
+        member = members.get(key)
+        if member is None:
+            member = members.setdefault(key, _FamilyMember(self, key))
+        return member
+
+
+class _FamilyMember(Provider[VT]):
+    """
+    the value of a key in a FamilyFactory. Members are interned per family and key.
+    """
+
+    STATE_FIELDS: Tuple[str, ...] = Provider.STATE_FIELDS + ("_family", "_key")
+
+    def __init__(self, family: FamilyFactory[VT], key: Any) -> None:
+        super().__init__()
+        self._family = family
+        self._key = key
+        self._register_dependencies()
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        super().__setstate__(state)
+        self._register_dependencies()
+
+    def _dependencies(self) -> Tuple[Provider[Any], ...]:
+        if isinstance(self._key, Provider):
+            return (self._family, self._key)
+        return (self._family,)
+
+    def _describe(self) -> str:
+        key = self._key
+        key = key._describe() if isinstance(key, Provider) else repr(key)
+        return self._name or f"{self._family._describe()}[{key}]"
+
+    def _key_value(self) -> Any:
+        key = self._key
+        return key.get() if isinstance(key, Provider) else key
+
+    def get(self) -> VT:
+        if (
+            _hooks
+            and _tracing.get() is not self
+            and isinstance(self._current_override(), _SentinelClass)
+        ):
+            # resolved before tracing, so that the source of the key is known
+            key = self._key_value()
+            return _trace(
+                self,
+                lambda: self._family.get(key),
+                self._describe(),
+                self._family._key_source(key),
+            )
+        return super().get()
+
+    def _provide(self) -> VT:
+        return self._family.get(self._key_value())
+
+
+class _Scope:
+    def __init__(self) -> None:
+        self.values: Dict[Provider[Any], Any] = {}
+        self.teardowns: List[Generator[Any, Any, Any]] = []
+
+    def close(self) -> None:
+        self.values.clear()
+        error: Optional[BaseException] = None
+        while self.teardowns:
+            generator = self.teardowns.pop()
+            try:
+                next(generator)
+            except StopIteration:
+                continue
+            except BaseException as e:
+                error = error or e
+                continue
+            error = error or RuntimeError("scoped generator didn't stop")
+        if error is not None:
+            raise error
+
+
+_current_scope: "contextvars.ContextVar[Optional[_Scope]]" = contextvars.ContextVar(
+    "simple_di_scope", default=None
+)
+
+
+class _ScopeContext:
+    def __init__(self) -> None:
+        self._scope = _Scope()
+        self._token: "Optional[contextvars.Token[Optional[_Scope]]]" = None
+
+    def __enter__(self) -> None:
+        self._token = _current_scope.set(self._scope)
+
+    def __exit__(self, *exc_info: Any) -> None:
+        assert self._token is not None
+        _current_scope.reset(self._token)
+        self._scope.close()
+
+    async def __aenter__(self) -> None:
+        self.__enter__()
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        self.__exit__(*exc_info)
+
+
+def scope() -> _ScopeContext:
+    """
+    context manager (sync or async) in which each ScopedFactory is built once. The
+    values are released in the reverse order of creation when the scope exits.
+    """
+    return _ScopeContext()
+
+
+class ScopedFactory(Factory[VT]):
+    """
+    provider that returns the result of a callable, but memorize the returns for
+    the current `scope`. With a generator function, the yielded value is provided,
+    and the code after `yield` runs when the scope exits.
+    """
+
+    def __init__(
+        self,
+        func: CallableType[..., Union[VT, Generator[VT, None, None]]],
+        *args: Any,
+        **kwargs: Any
+    ) -> None:
+        super().__init__(cast(CallableType[..., VT], func), *args, **kwargs)
+
+    def _is_cached(self) -> bool:
+        current = _current_scope.get()
+        return current is not None and self in current.values
+
+    def _can_provide(self) -> bool:
+        return False  # memorized per scope, not as a whole
+
+    def _provide(self) -> VT:
+        current = _current_scope.get()
+        if current is None:
+            raise RuntimeError("ScopedFactory cannot be get outside of a scope")
+        values = current.values
+        if self in values:
+            return cast(VT, values[self])
+        value: Any = super()._provide()
+        if isinstance(value, GeneratorType):
+            current.teardowns.append(value)
+            value = next(value)
+        values[self] = value
+        return cast(VT, value)
+
+
+class Resource(SingletonFactory[VT]):
+    """
+    provider that returns the value yielded by a generator or an async generator
+    function, and memorize it until `shutdown`, which runs the code after `yield`.
+    Async generator functions could only be resolved with `aget`.
+    """
+
+    _generator: Optional[
+        Union[Generator[VT, None, None], AsyncGenerator[VT, None]]
+    ] = None
+    _pending: "Optional[asyncio.Future[VT]]" = None
+
+    def __init__(
+        self,
+        func: CallableType[
+            ..., Union[Generator[VT, None, None], AsyncGenerator[VT, None]]
+        ],
+        *args: Any,
+        **kwargs: Any
+    ) -> None:
+        super().__init__(cast(CallableType[..., VT], func), *args, **kwargs)
+
+    def _frozen_value(self) -> Any:
+        return self._override  # the resource could still be shut down
+
+    def _drop_process_state(self) -> None:
+        super()._drop_process_state()
+        self._generator = None  # torn down by the process that built it
+        self._pending = None
+
+    @property
+    def is_async(self) -> bool:
+        import inspect
+
+        return inspect.isasyncgenfunction(self._func)
+
+    def _can_provide(self) -> bool:
+        return not self.is_async or self._is_cached()
+
+    def __getstate__(self) -> Dict[str, Any]:
+        state = super().__getstate__()
+        state["_cache"] = sentinel  # the resource is owned by this process
+        return state
+
+    def _provide(self) -> VT:
+        cache = self._cache
+        if not isinstance(cache, _SentinelClass):
+            return cache
+        if self.is_async:
+            raise RuntimeError("async Resource cannot be get synchronously, use aget")
+        with self._lock:
+            if not isinstance(self._cache, _SentinelClass):
+                return self._cache
+            generator = cast(Generator[VT, None, None], Factory._provide(self))
+            value = next(generator)
+            self._generator = generator
+            self._cache = value
+            return value
+
+    async def _abuild(self) -> VT:
+        try:
+            generator = cast(AsyncGenerator[VT, None], await self._acall())
+            value = await generator.__anext__()
+            self._generator = generator
+            self._cache = value
+            return value
+        finally:
+            self._pending = None
+
+    async def aget(self) -> VT:
+        if _hooks and _tracing.get() is not self:
+            return await self._atrace(self.aget)
+        override = self._current_override()
+        if not isinstance(override, _SentinelClass):
+            return override
+        if not self.is_async:
+            return self._provide()
+        cache = self._cache
+        if not isinstance(cache, _SentinelClass):
+            return cache
+        import asyncio
+
+        if self._pending is None:
+            self._pending = asyncio.ensure_future(self._abuild())
+        return await asyncio.shield(self._pending)
+
+    def _release(
+        self,
+    ) -> Optional[Union[Generator[VT, None, None], AsyncGenerator[VT, None]]]:
+        with self._lock:
+            generator = self._generator
+            self._generator = None
+            self._cache = sentinel
+        if generator is not None:
+            self._changed()
+        return generator
+
+    def shutdown(self) -> None:
+        """
+        run the teardown of the resource if it has been built
+        """
+        if isinstance(self._generator, AsyncGeneratorType):
+            raise RuntimeError("async Resource should be shut down with ashutdown")
+        generator = cast(Optional[Generator[VT, None, None]], self._release())
+        if generator is None:
+            return
+        try:
+            next(generator)
+        except StopIteration:
+            return
+        raise RuntimeError("Resource generator didn't stop")
+
+    async def ashutdown(self) -> None:
+        """
+        run the teardown of the resource if it has been built, awaiting it for async
+        generators
+        """
+        if not isinstance(self._generator, AsyncGeneratorType):
+            self.shutdown()
+            return
+        generator = cast(Optional[AsyncGenerator[VT, None]], self._release())
+        if generator is None:
+            return
+        try:
+            await generator.__anext__()
+        except StopAsyncIteration:
+            return
+        raise RuntimeError("Resource generator didn't stop")
+
 
 Callable = Factory
 MemoizedCallable = SingletonFactory
 
 ConfigDictType = Dict[Union[str, int], Any]
 PathItemType = Union[int, str, Provider[int], Provider[str]]
+ConfigPathType = Tuple[Any, ...]
+# (path written, its dictionary, value replaced or sentinel, written to the data)
+_WriteType = Tuple[ConfigPathType, Any, Any, bool]
+
+
+class _CompressedData:
+    """
+    zlib compressed pickle of a configuration dictionary
+    """
+
+    def __init__(self, data: Any) -> None:
+        import pickle
+        import zlib
+
+        self.payload = zlib.compress(
+            pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL), 1
+        )
+
+    def load(self) -> Any:
+        import pickle
+        import zlib
+
+        return pickle.loads(zlib.decompress(self.payload))
+
+
+def _flatten(data: Any, prefix: ConfigPathType = ()) -> Dict[ConfigPathType, Any]:
+    """
+    map every path of a nested dictionary to its value, dictionaries included
+    """
+    flat = {prefix: data}
+    stack = [(prefix, data)]
+    while stack:
+        path, node = stack.pop()
+        if isinstance(node, dict):
+            for key, value in node.items():
+                child = path + (key,)
+                flat[child] = value
+                stack.append((child, value))
+    return flat
 
 
 class Configuration(Provider[ConfigDictType]):
     """
     special provider that reflects the structure of a configuration dictionary.
+
+    Layers added with `add_layer` are deep merged over the data in order. The merged
+    values are kept in a flat index from paths to values, sharing every subtree
+    only one layer contributes to, so items resolve with a single lookup whatever
+    their depth.
     """
 
-    STATE_FIELDS: Tuple[str, ...] = Provider.STATE_FIELDS + ("_data", "fallback")
+    STATE_FIELDS: Tuple[str, ...] = Provider.STATE_FIELDS + (
+        "_data",
+        "fallback",
+        "_layers",
+    )
+
+    _items: Optional[Dict[Tuple[PathItemType, ...], "_ConfigurationItem"]] = None
+    _layers: Tuple[Tuple[str, ConfigDictType], ...] = ()
+
+    # flattened data and layers, and the merged index built from them on first use
+    _flats: Optional[List[Dict[ConfigPathType, Any]]] = None
+    _index: Optional[Dict[ConfigPathType, Any]] = None
+    _root: Any = sentinel
+
+    # the first write of each (dictionary id, key) of the data since the last `set`
+    _journal: Optional[Dict[Tuple[int, Any], _WriteType]] = None
 
     def __init__(
         self,
@@ -150,36 +1017,394 @@ class Configuration(Provider[ConfigDictType]):
         self._data = data
         self.fallback = fallback
 
-    def set(self, value: Union[_SentinelClass, ConfigDictType]) -> None:
+    def __getstate__(self) -> Dict[str, Any]:
+        state = super().__getstate__()
+        if _compact_pickling.get():
+            if not isinstance(self._data, _SentinelClass):
+                state["_data"] = _CompressedData(self._data)
+            if self._layers:
+                state["_layers"] = _CompressedData(self._layers)
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        super().__setstate__(state)
+        if isinstance(self._data, _CompressedData):
+            self._data = self._data.load()
+        if isinstance(self._layers, _CompressedData):
+            self._layers = self._layers.load()
+        self._journal = None
+        self._drop_index()
+
+    def _path_changed(self, *paths: ConfigPathType) -> None:
+        """
+        bump the version after writing to `paths`, notifying only the dependents that
+        could see the change
+        """
+        self._state_changed()
+        self._version = next(_versions)
+        if self._dependents:
+            for dependent in list(self._dependents):
+                if not isinstance(dependent, _ConfigurationItem) or any(
+                    dependent._overlaps(path) for path in paths
+                ):
+                    dependent._upstream_changed()
+
+    def _drop_index(self) -> None:
+        self._flats = self._index = None
+        self._root = sentinel
+
+    def _build_index(self) -> None:
+        flats = [{} if isinstance(self._data, _SentinelClass) else _flatten(self._data)]
+        flats.extend(_flatten(data) for _, data in self._layers)
+        self._flats = flats
+        self._index = {}
+        self._reindex(set().union(*flats))
+
+    def _merged(self, path: ConfigPathType, changed: List[Any]) -> Any:
+        """
+        the value at `path` once the layers are merged, or sentinel if there is none.
+        A dictionary merged before is copied with only its `changed` keys updated.
+        """
+        assert self._flats is not None and self._index is not None
+        index = self._index
+        found: List[Dict[Any, Any]] = []
+        for flat in reversed(self._flats):
+            value = flat.get(path, sentinel)
+            if isinstance(value, _SentinelClass):
+                if any(
+                    not isinstance(flat.get(path[:i], {}), dict)
+                    for i in range(len(path))
+                ):
+                    break  # shadowed by a value above the dictionaries below
+                continue
+            if not isinstance(value, dict):
+                if not found:
+                    return value
+                break
+            found.append(value)
+        if len(found) <= 1:
+            return found[0] if found else sentinel
+        previous = index.get(path)
+        if isinstance(previous, dict):
+            merged = dict(previous)
+            for key in changed:
+                value = index.get(path + (key,), sentinel)
+                if isinstance(value, _SentinelClass):
+                    merged.pop(key, None)
+                else:
+                    merged[key] = value
+            return merged
+        merged = {}
+        for value in reversed(found):
+            for key in value:
+                if key not in merged:
+                    merged[key] = index[path + (key,)]
+        return merged
+
+    def _reindex(self, paths: Set[ConfigPathType]) -> None:
+        """
+        merge the values at `paths` again, the deepest first so that the dictionaries
+        merged from several layers are rebuilt from their updated children
+        """
+        index = self._index
+        assert index is not None
+        changed: Dict[ConfigPathType, List[Any]] = {}
+        for path in paths:
+            if path:
+                changed.setdefault(path[:-1], []).append(path[-1])
+        for path in sorted(paths, key=len, reverse=True):
+            value = self._merged(path, changed.get(path, []))
+            if isinstance(value, _SentinelClass):
+                index.pop(path, None)
+            else:
+                index[path] = value
+        self._root = index.get((), sentinel)
+
+    def _touched(self, flat: Dict[ConfigPathType, Any]) -> Set[ConfigPathType]:
+        """
+        the paths whose merged value depends on a layer: its own paths and the paths
+        of the other layers below its values
+        """
+        assert self._flats is not None
+        touched = set(flat)
+        for path, value in flat.items():
+            if not isinstance(value, dict):
+                for other in self._flats:
+                    below = other.get(path)
+                    if isinstance(below, dict):
+                        touched.update(_flatten(below, path))
+        return touched
+
+    def _merged_root(self) -> Any:
+        if self._index is None:
+            self._build_index()
+        return self._root
+
+    def _writable(self) -> Tuple[Any, bool]:
+        """
+        the dictionary items write into, and whether the write should be re-indexed
+        """
+        override = self._current_override()
+        if not isinstance(override, _SentinelClass):
+            return override, False
+        if isinstance(self._data, _SentinelClass):
+            if not self._layers:
+                return self.get(), False
+            self._data = {}
+            self._drop_index()
+        return self._data, True
+
+    def _data_written(
+        self, path: ConfigPathType, old: Any, value: Any, parent: Any
+    ) -> None:
+        """
+        re-index the paths of the data touched by writing `value` over `old` in
+        `parent`, sentinel standing for a missing key
+        """
+        if self._flats is None or self._index is None:
+            return
+        node: Any = self._data
+        for key in path[:-1]:
+            if not isinstance(node, dict):
+                return  # written below a list, which are not indexed
+            node = node.get(key)
+        if node is not parent or not isinstance(parent, dict):
+            return  # written to a list, or to a dictionary replaced since
+        flat = self._flats[0]
+        touched = {path[:i] for i in range(len(path))}
+        if not isinstance(old, _SentinelClass):
+            for stale in _flatten(old, path):
+                flat.pop(stale, None)
+                touched.add(stale)
+        if not isinstance(value, _SentinelClass):
+            written = _flatten(value, path)
+            flat.update(written)
+            touched.update(written)
+        self._reindex(touched)
+
+    def _write(self, path: ConfigPathType, value: Any) -> _WriteType:
+        """
+        write `value` at `path` with a single assignment, the missing dictionaries
+        being built aside so that a failing write changes nothing. Return what undoes
+        the write.
+        """
+        self._check_not_frozen()
+        _cursor, indexed = self._writable()
+        for depth, i in enumerate(path[:-1]):
+            _next: Union[_SentinelClass, Dict[Any, Any]] = _cursor.get(i, sentinel)
+            if isinstance(_next, _SentinelClass):
+                for missing in reversed(path[depth + 1 :]):
+                    value = {missing: value}
+                path = path[: depth + 1]
+                break
+            _cursor = _next
+        key = path[-1]
+        old = _cursor.get(key, sentinel) if isinstance(_cursor, dict) else _cursor[key]
+        _cursor[key] = value
+        write = (path, _cursor, old, indexed)
+        if indexed:
+            self._data_written(path, old, value, _cursor)
+            self._journaled(write)
+        self._path_changed(path)
+        return write
+
+    def _journaled(self, write: _WriteType) -> _WriteType:
+        """
+        journal a write of the data unless its location was written before, returning
+        the journaled one
+        """
+        if self._journal is None:
+            self._journal = {}
+        path, parent, _, _ = write
+        return self._journal.setdefault((id(parent), path[-1]), write)
+
+    def _undo(self, write: _WriteType) -> _WriteType:
+        """
+        put back the value a write replaced, returning what undoes it in turn
+        """
+        path, parent, old, indexed = write
+        key = path[-1]
+        current = parent.get(key, sentinel) if isinstance(parent, dict) else parent[key]
+        if not isinstance(old, _SentinelClass):
+            parent[key] = old
+        elif not isinstance(current, _SentinelClass):
+            del parent[key]
+        if indexed:
+            self._data_written(path, current, old, parent)
+        return (path, parent, current, indexed)
+
+    def _reset_path(self, path: ConfigPathType) -> None:
+        """
+        undo the writes since the last `set` at, below and above `path`, latest first
+        """
+        self._check_not_frozen()
+        journal = self._journal
+        if not journal:
+            return
+        paths = [path]
+        for key, write in reversed(list(journal.items())):
+            size = min(len(path), len(write[0]))
+            if write[0][:size] == path[:size]:
+                del journal[key]
+                self._undo(write)
+                paths.append(write[0])
+        self._path_changed(*paths)
+
+    def _item(self, path: Tuple[PathItemType, ...]) -> "_ConfigurationItem":
+        items = self._items
+        if items is None:
+            items = self._items = {}
+        item = items.get(path)
+        if item is None:
+            item = items.setdefault(path, _ConfigurationItem(config=self, path=path))
+            if self._frozen:
+                item._freeze()
+        return item
+
+    def _can_provide(self) -> bool:
+        root = self._merged_root()
+        return not isinstance(root, _SentinelClass) or not isinstance(
+            self.fallback, _SentinelClass
+        )
+
+    def _frozen_value(self) -> Any:
+        if not isinstance(self._override, _SentinelClass):
+            return self._override
+        root = self._merged_root()
+        if isinstance(root, _SentinelClass):
+            return self.fallback
+        return root
+
+    def _freeze(self) -> bool:
+        if not super()._freeze():
+            return False
+        for item in list(self._items.values()) if self._items else ():
+            item._freeze()
+        return True
+
+    def _unfreeze(self) -> None:
+        super()._unfreeze()
+        for item in list(self._items.values()) if self._items else ():
+            item._unfreeze()
+
+    def add_layer(self, name: str, data: ConfigDictType) -> None:
+        """
+        merge `data` over the data and the layers added before, replacing the layer
+        of the same name in place. Layers are shared, not copied, and should not be
+        modified once added.
+        """
+        self._check_not_frozen()
+        layers = list(self._layers)
+        names = [i for i, _ in layers]
+        touched: Set[ConfigPathType] = set()
+        paths = {(key,) for key in data}
+        if name in names:
+            position = names.index(name)
+            paths.update((key,) for key in layers[position][1])
+            layers[position] = (name, data)
+            if self._flats is not None:
+                touched = self._touched(self._flats[position + 1])
+                self._flats[position + 1] = _flatten(data)
+        else:
+            position = len(layers)
+            layers.append((name, data))
+            if self._flats is not None:
+                self._flats.append(_flatten(data))
+        self._layers = tuple(layers)
+        if self._flats is not None:
+            touched.update(self._touched(self._flats[position + 1]))
+            self._reindex(touched)
+        self._path_changed(*paths)
+
+    def remove_layer(self, name: str) -> None:
+        """
+        remove the layer added as `name`
+        """
+        self._check_not_frozen()
+        names = [i for i, _ in self._layers]
+        if name not in names:
+            raise KeyError(name)
+        position = names.index(name)
+        layers = list(self._layers)
+        _, data = layers.pop(position)
+        self._layers = tuple(layers)
+        if self._flats is not None:
+            touched = self._touched(self._flats.pop(position + 1))
+            self._reindex(touched)
+        self._path_changed(*((key,) for key in data))
+
+    def layer_names(self) -> List[str]:
+        """
+        names of the layers, from the lowest to the highest priority
+        """
+        return [name for name, _ in self._layers]
+
+    def set(
+        self, value: Union[_SentinelClass, ConfigDictType], local: bool = False
+    ) -> None:
         if isinstance(value, _SentinelClass):
             return
+        self._check_not_frozen()
+        if local:
+            self._local_var().set(value)
+            return
         self._data = value
+        self._journal = None
+        self._drop_index()
+        self._changed()
 
     def get(self) -> Union[ConfigDictType, Any]:
-        if isinstance(self._data, _SentinelClass):
+        if _hooks and _tracing.get() is not self:
+            return self._trace(self.get)
+        override = self._current_override()
+        if not isinstance(override, _SentinelClass):
+            return override
+        root = self._root if self._index is not None else self._merged_root()
+        if isinstance(root, _SentinelClass):
             if isinstance(self.fallback, _SentinelClass):
                 raise ValueError("Configuration Provider not initialized")
             return self.fallback
-        return self._data
+        return root
 
     def reset(self) -> None:
-        raise NotImplementedError()
+        """
+        undo the writes of the items since the last `set`, latest first, and remove
+        the overriding
+        """
+        self._check_not_frozen()
+        journal = self._journal
+        self._journal = None
+        for write in reversed(list(journal.values())) if journal else ():
+            self._undo(write)
+        super().reset()
 
     def __getattr__(self, name: str) -> "_ConfigurationItem":
-        if name in ("_data", "_override", "fallback"):
+        if name in ("_data", "_override", "_local", "fallback"):
             raise AttributeError()
-        return _ConfigurationItem(config=self, path=(name,))
+        item = self._item((name,))
+        self.__dict__[name] = item  # skip __getattr__ on the following accesses
+        return item
 
     def __getitem__(self, key: PathItemType) -> "_ConfigurationItem":
-        return _ConfigurationItem(config=self, path=(key,))
+        return self._item((key,))
 
     def __repr__(self) -> str:
         return f"Configuration(data={self._data}, fallback={self.fallback})"
 
 
 class _ConfigurationItem(Provider[Any]):
+    """
+    a path in a Configuration. Items are interned per configuration and path, and
+    remember the value they resolved to until the configuration changes. Writes
+    should go through `set` to be seen by the cached reads. Context-local overrides
+    apply to the item itself, not to the paths below it.
+    """
+
     STATE_FIELDS: Tuple[str, ...] = Provider.STATE_FIELDS + ("_config", "_path")
 
+    # (data, version, resolved path, value)
+    _cached: Optional[Tuple[Any, int, Tuple[Any, ...], Any]] = None
+
     def __init__(
         self,
         config: Configuration,
@@ -188,47 +1413,148 @@ class _ConfigurationItem(Provider[Any]):
         super().__init__()
         self._config = config
         self._path = path
+        self._has_provider_keys = any(isinstance(i, Provider) for i in path)
+        self._register_dependencies()
 
-    def set(self, value: Any) -> None:
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        super().__setstate__(state)
+        self._has_provider_keys = any(isinstance(i, Provider) for i in self._path)
+        self._register_dependencies()
+
+    def _dependencies(self) -> Tuple[Provider[Any], ...]:
+        return (self._config,) + tuple(i for i in self._path if isinstance(i, Provider))
+
+    def _resolve_path(self) -> Tuple[Any, ...]:
+        if not self._has_provider_keys:
+            return self._path
+        return tuple(i.get() if isinstance(i, Provider) else i for i in self._path)
+
+    def _overlaps(self, path: Tuple[Any, ...]) -> bool:
+        if self._has_provider_keys:
+            return True
+        size = min(len(path), len(self._path))
+        return self._path[:size] == path[:size]
+
+    def set(self, value: Any, local: bool = False) -> None:
         if isinstance(value, _SentinelClass):
             return
-        _cursor = self._config.get()
-        for i in self._path[:-1]:
-            if isinstance(i, Provider):
-                i = i.get()
-            _next: Union[_SentinelClass, Dict[Any, Any]] = _cursor.get(i, sentinel)
-            if isinstance(_next, _SentinelClass):
-                _next = {}
-                _cursor[i] = _next
-            _cursor = _next
-        last_i = self._path[-1]
-        if isinstance(last_i, Provider):
-            last_i = last_i.get()
-        _cursor[last_i] = value
+        if local:
+            super().set(value, local=True)
+            return
+        self._check_not_frozen()
+        self._config._write(self._resolve_path(), value)
+
+    @contextlib.contextmanager
+    def patch(self, value: Any, local: bool = False) -> Generator[None, None, None]:
+        """
+        write `value` at this path, restoring the value it replaced, or its absence,
+        after the context. With `local=True` the value overrides this item only, in
+        the current context, leaving the configuration data untouched.
+        """
+        if isinstance(value, _SentinelClass):
+            yield
+            return
+        if local:
+            with super().patch(value, local=True):
+                yield
+            return
+        self._check_not_frozen()
+        config = self._config
+        write = config._write(self._resolve_path(), value)
+        try:
+            yield
+        finally:
+            path, parent, _, indexed = write
+            restore = config._undo(write)
+            if indexed and config._journaled(restore) is write:
+                # back to its value at the last set
+                config._journal.pop((id(parent), path[-1]))  # type: ignore[union-attr]
+            config._path_changed(path)
+
+    def _describe(self) -> str:
+        path = ".".join(
+            i._describe() if isinstance(i, Provider) else str(i) for i in self._path
+        )
+        return f"{self._config._describe()}.{path}"
+
+    def _is_cached(self) -> bool:
+        cached = self._cached
+        return cached is not None and cached[1] == self._config._version
+
+    def _frozen_value(self) -> Any:
+        if self._has_provider_keys or not self._config._frozen:
+            return sentinel
+        try:
+            return self.get()
+        except (KeyError, IndexError, TypeError):
+            return sentinel
+
+    def _snapshot_value(self, values: Dict[Provider[Any], Any]) -> Any:
+        _cursor = self._config._snapshot_value(values)
+        if isinstance(_cursor, _SentinelClass) or _cursor is self._config.fallback:
+            return _cursor
+        try:
+            for i in self._path:
+                if isinstance(i, Provider):
+                    key = i._snapshot_value(values)
+                    i = i.get() if isinstance(key, _SentinelClass) else key
+                _cursor = _cursor[i]
+        except (KeyError, IndexError, TypeError):
+            return sentinel  # left to fail when resolved
+        return _cursor
 
     def get(self) -> Any:
-        _cursor = self._config.get()
+        if _hooks and _tracing.get() is not self:
+            return self._trace(self.get)
+        if self._local is not None:
+            value = self._local.get()
+            if not isinstance(value, _SentinelClass):
+                return value
+        config = self._config
+        _cursor = config.get()
+        if not isinstance(config.fallback, _SentinelClass) and _cursor is config.fallback:
+            return config.fallback
+        version = config._version
+        path = self._resolve_path()
+        cached = self._cached
         if (
-            not isinstance(self._config.fallback, _SentinelClass)
-            and _cursor is self._config.fallback
+            cached is not None
+            and cached[0] is _cursor
+            and cached[1] == version
+            and (cached[2] is path or cached[2] == path)
         ):
-            return self._config.fallback
-        for i in self._path:
-            if isinstance(i, Provider):
-                i = i.get()
+            return cached[3]
+        data = _cursor
+        if _cursor is config._root:
+            _cursor = config._index.get(path, sentinel)  # type: ignore[union-attr]
+            if not isinstance(_cursor, _SentinelClass):
+                self._cached = (data, version, path, _cursor)
+                return _cursor
+            _cursor = data  # below a list, or missing
+        for i in path:
             _cursor = _cursor[i]
+        self._cached = (data, version, path, _cursor)
         return _cursor
 
     def reset(self) -> None:
-        raise NotImplementedError()
+        """
+        restore this path to its value at the last `set` of the configuration. Writes
+        above the path since then are undone as a whole.
+        """
+        self._check_not_frozen()
+        if self._local is not None:
+            self._local.set(sentinel)
+        self._config._reset_path(self._resolve_path())
 
     def __getattr__(self, name: str) -> "_ConfigurationItem":
-        if name in ("_config", "_path", "_override"):
+        if name in ("_config", "_path", "_override", "_local", "_has_provider_keys"):
             raise AttributeError()
-        return type(self)(config=self._config, path=self._path + (name,))
+        item = self._config._item(self._path + (name,))
+        self.__dict__[name] = item  # skip __getattr__ on the following accesses
+        return item
 
     def __getitem__(self, key: PathItemType) -> "_ConfigurationItem":
-        return type(self)(config=self._config, path=self._path + (key,))
+        return self._config._item(self._path + (key,))
 
     def __repr__(self) -> str:
         return f"_ConfigurationItem(_config={self._config._data}, _path={self._path})"
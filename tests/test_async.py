@@ -0,0 +1,117 @@
+"""
+asyncio support tests
+"""
+import asyncio
+from typing import Any, Awaitable, List, Tuple, TypeVar
+
+import pytest
+
+from simple_di import Provide, Provider, container, inject
+from simple_di.providers import (
+    AsyncFactory,
+    AsyncSingletonFactory,
+    Configuration,
+    Static,
+)
+
+T = TypeVar("T")
+
+
+def _run(coro: Awaitable[T]) -> T:
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+
+def test_async_factory() -> None:
+    async def build(c: int) -> int:
+        await asyncio.sleep(0)
+        return 2 * c + 1
+
+    @container
+    class Options:
+        cpu: Provider[int] = Static(2)
+        worker: Provider[int] = AsyncFactory(build, c=cpu)
+        sync_worker: Provider[int] = AsyncFactory(lambda w: w + 1, worker)
+
+    OPTIONS = Options()
+
+    assert _run(OPTIONS.worker.aget()) == 5
+    assert _run(OPTIONS.sync_worker.aget()) == 6
+    assert _run(OPTIONS.cpu.aget()) == 2
+
+    with pytest.raises(RuntimeError):
+        OPTIONS.worker.get()
+
+    with OPTIONS.worker.patch(3):
+        assert OPTIONS.worker.get() == 3
+        assert _run(OPTIONS.sync_worker.aget()) == 4
+
+
+def test_async_inject() -> None:
+    async def build(c: int) -> int:
+        return c + 1
+
+    @container
+    class Options:
+        config = Configuration({"cpu": 2})
+        worker: Provider[int] = AsyncFactory(build, config.cpu)
+
+    OPTIONS = Options()
+
+    @inject
+    async def func(
+        cpu: int = Provide[OPTIONS.config.cpu], worker: int = Provide[OPTIONS.worker]
+    ) -> Tuple[int, int]:
+        return cpu, worker
+
+    assert asyncio.iscoroutinefunction(func)
+    assert _run(func()) == (2, 3)
+    assert _run(func(1)) == (1, 3)
+    assert _run(func(worker=4)) == (2, 4)
+
+
+def test_async_singleton_once() -> None:
+    calls: List[None] = []
+
+    async def build() -> object:
+        calls.append(None)
+        await asyncio.sleep(0.01)
+        return object()
+
+    @container
+    class Options:
+        client: Provider[object] = AsyncSingletonFactory(build)
+
+    OPTIONS = Options()
+
+    async def main() -> Any:
+        return await asyncio.gather(*(OPTIONS.client.aget() for _ in range(50)))
+
+    values = _run(main())
+    assert len(calls) == 1
+    assert all(v is values[0] for v in values)
+    assert OPTIONS.client.get() is values[0]
+
+
+def test_async_singleton_failure() -> None:
+    calls: List[None] = []
+
+    async def build() -> int:
+        calls.append(None)
+        if len(calls) == 1:
+            raise ValueError()
+        return 1
+
+    @container
+    class Options:
+        value: Provider[int] = AsyncSingletonFactory(build)
+
+    OPTIONS = Options()
+
+    with pytest.raises(ValueError):
+        _run(OPTIONS.value.aget())
+    assert _run(OPTIONS.value.aget()) == 1
+    assert len(calls) == 2
@@ -1,19 +1,30 @@
 """
 common tests
 """
+import asyncio
+import contextvars
 import random
-from typing import Dict, Optional, Tuple, cast
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Generator, List, Optional, Tuple, cast
 
 import pytest
 
-from simple_di import Provide, Provider, container, inject
+from simple_di import LazyProxy, Provide, Provider, container, inject, skip
 from simple_di.providers import (
     ConfigDictType,
     Configuration,
     Factory,
+    FamilyFactory,
     Placeholder,
+    ReactiveFactory,
+    ScopedFactory,
     SingletonFactory,
     Static,
+    ThreadLocalSingleton,
+    scope,
 )
 
 # Usage
@@ -96,6 +107,47 @@ def test_inject_method() -> None:
     OPTIONS.cpu.reset()
 
 
+def test_local_patch() -> None:
+    @container
+    class Options:
+        cpu: Provider[int] = Static(2)
+        config = Configuration({"a": 1})
+
+    OPTIONS = Options()
+
+    @inject
+    def func(cpu: int = Provide[OPTIONS.cpu], a: int = Provide[OPTIONS.config.a]) -> int:
+        return cpu + a
+
+    barrier = threading.Barrier(2)
+
+    def worker(cpu: int) -> int:
+        with OPTIONS.cpu.patch(cpu, local=True):
+            barrier.wait()
+            return func()
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        assert list(executor.map(worker, (10, 20))) == [11, 21]
+    assert func() == 3
+
+    with pytest.raises(ValueError):
+        with OPTIONS.cpu.patch(5, local=True), OPTIONS.cpu.patch(6):
+            assert func() == 6
+            raise ValueError()
+    assert func() == 3
+
+    with OPTIONS.config.patch({"a": 5}, local=True):
+        assert func() == 7
+    assert func() == 3
+
+    def set_local() -> int:
+        OPTIONS.cpu.set(4, local=True)
+        return func()
+
+    assert contextvars.copy_context().run(set_local) == 5
+    assert func() == 3
+
+
 def test_squeeze_none() -> None:
     @container
     class Options:
@@ -120,6 +172,305 @@ def test_squeeze_none() -> None:
     assert func2(1) == 1
 
 
+def test_inject_plan() -> None:
+    @container
+    class Options:
+        cpu: Provider[int] = Static(2)
+        port: Provider[int] = Static(5000)
+
+    OPTIONS = Options()
+
+    @inject
+    def func(
+        a: int, *args: int, cpu: int = Provide[OPTIONS.cpu], **kwargs: int
+    ) -> Tuple[int, Tuple[int, ...], int, Dict[str, int]]:
+        return a, args, cpu, kwargs
+
+    assert func(1) == (1, (), 2, {})
+    assert func(1, 2, 3, cpu=4, b=5) == (1, (2, 3), 4, {"b": 5})
+    assert func(1, cpu=cast(int, skip)) == (1, (), 2, {})
+    assert func(1, b=cast(int, OPTIONS.port)) == (1, (), 2, {"b": 5000})
+
+    with pytest.raises(TypeError):
+        func()  # type: ignore
+
+
+@pytest.mark.skipif(sys.version_info < (3, 8), reason="positional-only parameters")
+def test_inject_positional_only() -> None:
+    namespace: Dict[str, Any] = {"Provide": Provide, "cpu": Static(2)}
+    exec("def func(a, cpu=Provide[cpu], /):\n    return a, cpu", namespace)
+    func = inject(namespace["func"])
+
+    assert func(1) == (1, 2)
+    assert func(1, 3) == (1, 3)
+    with pytest.raises(TypeError):
+        func()
+
+
+def test_inject_compiled() -> None:
+    import inspect
+
+    @container
+    class Options:
+        cpu: Provider[int] = Static(2)
+        port: Provider[int] = Static(5000)
+
+    OPTIONS = Options()
+
+    def func(
+        a: int,
+        *args: int,
+        cpu: int = Provide[OPTIONS.cpu],
+        b: int = 1,
+        **kwargs: int,
+    ) -> Tuple[int, Tuple[int, ...], int, int, Dict[str, int]]:
+        return a, args, cpu, b, kwargs
+
+    compiled = inject(func, compiled=True)
+    assert inspect.signature(compiled, follow_wrapped=False).parameters.keys() == (
+        inspect.signature(func).parameters.keys()
+    )
+    assert compiled.__name__ == "func"
+    assert compiled.__wrapped__ is func  # type: ignore
+    assert compiled(1) == (1, (), 2, 1, {})
+    assert compiled(1, 2, 3, cpu=4, b=5, c=6) == (1, (2, 3), 4, 5, {"c": 6})
+    assert compiled(1, cast(int, skip), cpu=cast(int, skip), b=cast(int, skip)) == (
+        1,
+        (),
+        2,
+        1,
+        {},
+    )
+    assert compiled(1, c=cast(int, OPTIONS.port)) == (1, (), 2, 1, {"c": 5000})
+    assert compiled(1, cpu=cast(int, OPTIONS.port)) == (1, (), 5000, 1, {})
+    with pytest.raises(TypeError):
+        compiled()  # type: ignore
+
+    squeezed = inject(func, squeeze_none=True, compiled=True)
+    assert squeezed(1, None, cpu=None, b=None) == (1, (), 2, 1, {})
+    assert compiled(1, cpu=None) == (1, (), None, 1, {})  # type: ignore
+
+    class Service:
+        factor = 10
+
+        @inject(compiled=True)
+        def method(self, cpu: int = Provide[OPTIONS.cpu]) -> int:
+            return cpu * self.factor
+
+        @classmethod
+        @inject(compiled=True)
+        def create(cls, port: int = Provide[OPTIONS.port]) -> int:
+            return port + cls.factor
+
+    assert Service().method() == 20
+    assert Service().method(3) == 30
+    assert Service.create() == 5010
+
+    with OPTIONS.cpu.patch(4):
+        assert compiled(1)[2] == 4
+
+
+def test_inject_compiled_skip() -> None:
+    cpu = Static(7)
+
+    def func(a: int = 1, b: int = 2, c: int = Provide[cpu]) -> Tuple[int, int, int]:
+        return a, b, c
+
+    # a skipped argument stands for its own parameter, instead of shifting the others
+    assert inject(func)(cast(int, skip), 5) == (5, 2, 7)
+    assert inject(func, compiled=True)(cast(int, skip), 5) == (1, 5, 7)
+    squeezed = inject(func, squeeze_none=True, compiled=True)
+    assert squeezed(None, 5) == (1, 5, 7)  # type: ignore
+
+    def required(a: int, c: int = Provide[cpu]) -> Tuple[int, int]:
+        return a, c
+
+    for wrapper in (inject(required), inject(required, compiled=True)):
+        with pytest.raises(TypeError, match="'a'"):
+            wrapper(cast(int, skip))
+    with pytest.raises(TypeError, match="'a'"):
+        inject(required, squeeze_none=True, compiled=True)(None)  # type: ignore
+
+
+@pytest.mark.skipif(sys.version_info < (3, 8), reason="positional-only parameters")
+def test_inject_compiled_positional_only() -> None:
+    namespace: Dict[str, Any] = {"Provide": Provide, "cpu": Static(2)}
+    exec(
+        "def func(a, cpu=Provide[cpu], /, b=0, *, c=Provide[cpu]):\n"
+        "    return a, cpu, b, c",
+        namespace,
+    )
+    func = inject(namespace["func"], compiled=True)
+
+    assert func(1) == (1, 2, 0, 2)
+    assert func(1, 3, 4, c=5) == (1, 3, 4, 5)
+    with pytest.raises(TypeError):
+        func(a=1)
+    with pytest.raises(TypeError):
+        func(1, 2, 3, 4)
+
+
+def test_lazy_injection() -> None:
+    built: List[str] = []
+
+    class Model:
+        def __init__(self, name: str) -> None:
+            built.append(name)
+            self.name = name
+
+        def __call__(self, x: int) -> int:
+            return x * 2
+
+    @container
+    class Options:
+        model: Provider[Model] = SingletonFactory(Model, "model")
+        session: Provider[Model] = Factory(Model, "session")
+        items: Provider[List[int]] = Static([1, 2])
+
+    OPTIONS = Options()
+
+    @inject
+    def handler(
+        fast: bool,
+        model: Model = Provide.lazy[OPTIONS.model],
+        session: Model = Provide.lazy[OPTIONS.session],
+        items: List[int] = Provide.lazy[OPTIONS.items],
+    ) -> Any:
+        if fast:
+            return None
+        return model.name, model(2), session.name, len(items), list(items), items[0]
+
+    assert handler(True) is None
+    assert built == []
+    assert handler(False) == ("model", 4, "session", 2, [1, 2], 1)
+    assert built == ["model", "session"]
+    assert handler(False)[2] == "session"
+    assert built == ["model", "session", "session"]  # once per call for Factory
+
+    compiled = inject(handler.__wrapped__, compiled=True)  # type: ignore
+    assert compiled(True) is None
+    assert len(built) == 3
+    assert handler(False, session=Model("passed"))[2] == "passed"
+    assert repr(LazyProxy(OPTIONS.model)) == "<LazyProxy of Options.model>"
+
+
+def test_lazy_proxy_operators() -> None:
+    number: Any = LazyProxy(Static(6))
+    assert (number + 1, 1 + number, number * 2, 13 % number) == (7, 7, 12, 1)
+    assert (-number, abs(-number), ~number, number**2) == (-6, 6, -7, 36)
+    assert number < 7 and number >= 6 and number != 5
+    assert (int(number), float(number), [0, 1, 2, 3, 4, 5, 6][number]) == (6, 6.0, 6)
+    assert (f"{number:>3}", divmod(number, 4), round(number)) == ("  6", (1, 2), 6)
+    number += 1
+    assert number == 7 and type(number) is int
+
+    class Session:
+        async def __aenter__(self) -> str:
+            return "entered"
+
+        async def __aexit__(self, *exc_info: Any) -> None:
+            pass
+
+    async def use(session: Any) -> str:
+        async with session as value:
+            return str(value)
+
+    loop = asyncio.new_event_loop()
+    try:
+        assert loop.run_until_complete(use(LazyProxy(Static(Session())))) == "entered"
+    finally:
+        loop.close()
+
+
+def test_family_factory() -> None:
+    built: List[str] = []
+    evicted: List[Tuple[str, str]] = []
+
+    def client(key: str, region: str) -> str:
+        built.append(key)
+        return f"{key}@{region}"
+
+    @container
+    class Options:
+        region: Provider[str] = Static("us")
+        tenant: Provider[str] = Static("a")
+        clients: FamilyFactory[str] = FamilyFactory(
+            client,
+            region,
+            maxsize=2,
+            on_evict=lambda k, v: evicted.append((k, v)),
+        )
+
+    OPTIONS = Options()
+
+    assert OPTIONS.clients.get("a") == "a@us"
+    assert OPTIONS.clients.get("a") == "a@us"
+    assert built == ["a"]
+    OPTIONS.clients.get("b")
+    OPTIONS.clients.get("a")  # b is now the least recently used
+    OPTIONS.clients.get("c")
+    assert evicted == [("b", "b@us")]
+    assert OPTIONS.clients.keys() == ["a", "c"]
+
+    @inject
+    def func(
+        a: str = Provide[OPTIONS.clients["a"]],
+        tenant: str = Provide[OPTIONS.clients[OPTIONS.tenant]],
+    ) -> Tuple[str, str]:
+        return a, tenant
+
+    assert OPTIONS.clients["a"] is OPTIONS.clients["a"]
+    assert func() == ("a@us", "a@us")
+    with OPTIONS.tenant.patch("d"):
+        assert func() == ("a@us", "d@us")
+    assert built == ["a", "b", "c", "d"]
+
+    OPTIONS.clients.clear()
+    assert OPTIONS.clients.keys() == []
+    with pytest.raises(TypeError):
+        OPTIONS.clients.get()
+    with OPTIONS.clients.patch("patched"):
+        assert func() == ("patched", "patched")
+
+
+def test_family_factory_ttl() -> None:
+    evicted: List[int] = []
+
+    def on_evict(key: int, value: object) -> None:
+        family.keys()  # called outside of the lock
+        evicted.append(key)
+
+    family: FamilyFactory[object] = FamilyFactory(
+        lambda key: object(), ttl=0.05, on_evict=on_evict
+    )
+    first = family.get(1)
+    assert family.get(1) is first
+    time.sleep(0.06)
+    assert family.get(1) is not first
+    assert evicted == [1]
+    family.get(2)
+    time.sleep(0.06)
+    family.purge()
+    assert family.keys() == []
+    assert sorted(evicted) == [1, 1, 2]
+
+
+def test_family_factory_once_per_key() -> None:
+    calls: List[int] = []
+
+    def build(key: int) -> int:
+        calls.append(key)
+        time.sleep(0.02)
+        return key * 10
+
+    family = FamilyFactory(build)
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        values = list(executor.map(lambda i: family.get(i % 2), range(32)))
+
+    assert values == [(i % 2) * 10 for i in range(32)]
+    assert sorted(calls) == [0, 1]
+
+
 def test_memoized_callable() -> None:
     @container
     class Options:
@@ -135,6 +486,160 @@ def test_memoized_callable() -> None:
     assert func() == first_value
 
 
+def test_singleton_thread_safety() -> None:
+    calls: List[None] = []
+
+    def build() -> object:
+        calls.append(None)
+        time.sleep(0.05)
+        return object()
+
+    @container
+    class Options:
+        model: Provider[object] = SingletonFactory(build)
+
+    OPTIONS = Options()
+    barrier = threading.Barrier(32)
+
+    def worker() -> object:
+        barrier.wait()
+        return OPTIONS.model.get()
+
+    with ThreadPoolExecutor(max_workers=32) as executor:
+        values = list(executor.map(lambda _: worker(), range(32)))
+
+    assert len(calls) == 1
+    assert all(v is values[0] for v in values)
+
+
+def test_singleton_failure() -> None:
+    calls: List[None] = []
+
+    def build() -> int:
+        calls.append(None)
+        if len(calls) == 1:
+            raise ValueError()
+        return 1
+
+    @container
+    class Options:
+        value: Provider[int] = SingletonFactory(build)
+
+    OPTIONS = Options()
+
+    with pytest.raises(ValueError):
+        OPTIONS.value.get()
+    assert OPTIONS.value.get() == 1
+    assert OPTIONS.value.get() == 1
+    assert len(calls) == 2
+
+
+def test_reactive_factory() -> None:
+    calls: List[int] = []
+
+    def build(cpu: int, port: int) -> int:
+        calls.append(cpu)
+        return cpu + port
+
+    @container
+    class Options:
+        config = Configuration({"port": 1, "host": "a"})
+        cpu: Provider[int] = Static(2)
+        double_cpu: Provider[int] = Factory(lambda c: 2 * c, cpu)
+        worker: Provider[int] = ReactiveFactory(build, double_cpu, config.port)
+
+    OPTIONS = Options()
+
+    assert OPTIONS.worker.get() == 5
+    assert OPTIONS.worker.get() == 5
+    assert len(calls) == 1
+
+    OPTIONS.config.host.set("b")
+    assert OPTIONS.worker.get() == 5
+    assert len(calls) == 1
+
+    OPTIONS.config.port.set(2)
+    assert OPTIONS.worker.get() == 6
+    assert len(calls) == 2
+
+    with OPTIONS.cpu.patch(3):
+        assert OPTIONS.worker.get() == 8
+    assert OPTIONS.worker.get() == 6
+    assert len(calls) == 4
+
+    OPTIONS.config.set({"port": 3})
+    assert OPTIONS.worker.get() == 7
+    assert len(calls) == 5
+
+
+def test_scoped_factory() -> None:
+    events: List[str] = []
+
+    def session(name: str) -> Generator[str, None, None]:
+        events.append(f"open {name}")
+        yield name
+        events.append(f"close {name}")
+
+    @container
+    class Options:
+        db: Provider[str] = ScopedFactory(session, "db")
+        cache: Provider[str] = ScopedFactory(session, "cache")
+        uid: Provider[object] = ScopedFactory(object)
+
+    OPTIONS = Options()
+
+    @inject
+    def func(
+        db: str = Provide[OPTIONS.db], cache: str = Provide[OPTIONS.cache]
+    ) -> Tuple[str, str]:
+        return db, cache
+
+    with pytest.raises(RuntimeError):
+        func()
+
+    with scope():
+        assert func() == ("db", "cache")
+        assert func() == ("db", "cache")
+        uid = OPTIONS.uid.get()
+        assert OPTIONS.uid.get() is uid
+        assert events == ["open db", "open cache"]
+    assert events == ["open db", "open cache", "close cache", "close db"]
+
+    with scope():
+        assert OPTIONS.uid.get() is not uid
+
+    async def task() -> object:
+        async with scope():
+            await asyncio.sleep(0)
+            return OPTIONS.uid.get()
+
+    async def main() -> List[object]:
+        return list(await asyncio.gather(task(), task()))
+
+    loop = asyncio.new_event_loop()
+    try:
+        first, second = loop.run_until_complete(main())
+    finally:
+        loop.close()
+    assert first is not second
+
+
+def test_thread_local_singleton() -> None:
+    @container
+    class Options:
+        client: Provider[object] = ThreadLocalSingleton(object)
+
+    OPTIONS = Options()
+
+    client = OPTIONS.client.get()
+    assert OPTIONS.client.get() is client
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        other = executor.submit(OPTIONS.client.get).result()
+        assert executor.submit(OPTIONS.client.get).result() is other
+    assert other is not client
+
+
 def test_config() -> None:
     @container
     class Options:
@@ -186,6 +691,32 @@ def test_complex_config() -> None:
     assert OPTIONS.default_local.get() == "a"
 
 
+def test_config_cache() -> None:
+    @container
+    class Options:
+        config = Configuration({"a": {"b": 1, "c": 2}})
+        key: Provider[str] = Static("b")
+        item = config.a[key]
+
+    OPTIONS = Options()
+
+    assert OPTIONS.config.a.b is OPTIONS.config.a.b
+    assert OPTIONS.config.a["b"] is OPTIONS.config["a"].b
+
+    assert OPTIONS.item.get() == 1
+    OPTIONS.config.a.b.set(3)
+    assert OPTIONS.item.get() == 3
+    with OPTIONS.key.patch("c"):
+        assert OPTIONS.item.get() == 2
+    assert OPTIONS.item.get() == 3
+
+    OPTIONS.config.set({"a": {"b": 4}})
+    assert OPTIONS.item.get() == 4
+    with OPTIONS.config.patch({"a": {"b": 5}}):
+        assert OPTIONS.item.get() == 5
+    assert OPTIONS.item.get() == 4
+
+
 def test_config_callable() -> None:
     @container
     class Options:
@@ -223,6 +754,139 @@ def test_config_fallback() -> None:
     assert func() is None
 
 
+def test_config_layers() -> None:
+    @container
+    class Options:
+        config = Configuration({"a": {"b": 1, "c": 2}, "d": {"e": 3}})
+        b_plus_one: Provider[int] = Factory(lambda b: b + 1, config.a.b)
+
+    OPTIONS = Options()
+    config = OPTIONS.config
+    assert OPTIONS.b_plus_one.get() == 2
+
+    config.add_layer("env", {"a": {"b": 10}})
+    assert config.get() == {"a": {"b": 10, "c": 2}, "d": {"e": 3}}
+    assert OPTIONS.b_plus_one.get() == 11
+    assert config.get()["d"] is cast(Dict[str, Any], config._data)["d"]  # untouched subtrees are shared
+
+    config.add_layer("cli", {"a": 0})
+    assert config.a.get() == 0
+    with pytest.raises(TypeError):
+        config.a.b.get()
+
+    config.remove_layer("cli")
+    assert config.a.b.get() == 10
+    assert config.a.c.get() == 2
+
+    config.add_layer("env", {"d": {"f": 4}})  # replaced in place
+    assert config.layer_names() == ["env"]
+    assert config.get() == {"a": {"b": 1, "c": 2}, "d": {"e": 3, "f": 4}}
+    assert OPTIONS.b_plus_one.get() == 2
+
+    config.d.e.set(5)
+    assert config.d.get() == {"e": 5, "f": 4}
+    config.d.f.set(6)  # written to the data, below the layer
+    assert config.d.f.get() == 4
+
+    config.remove_layer("env")
+    assert config.get() == {"a": {"b": 1, "c": 2}, "d": {"e": 5, "f": 6}}
+    with pytest.raises(KeyError):
+        config.remove_layer("env")
+
+
+def test_config_layers_only() -> None:
+    config = Configuration(fallback=None)
+    assert config.a.get() is None
+    config.add_layer("defaults", {"a": {"b": 1}})
+    assert config.a.b.get() == 1
+    config.a.c.set(2)
+    assert config.a.get() == {"b": 1, "c": 2}
+
+
+def test_config_patch() -> None:
+    @container
+    class Options:
+        config = Configuration({"a": {"b": 1}})
+        b_plus_one: Provider[int] = Factory(lambda b: b + 1, config.a.b)
+
+    OPTIONS = Options()
+    config = OPTIONS.config
+    data = config.get()
+    a = data["a"]
+
+    with config.a.b.patch(2):
+        assert OPTIONS.b_plus_one.get() == 3
+    assert OPTIONS.b_plus_one.get() == 2
+
+    with pytest.raises(ZeroDivisionError):
+        with config.c.d.patch(3):
+            assert config.get() == {"a": {"b": 1}, "c": {"d": 3}}
+            with config.a.patch({}):
+                1 / 0
+    assert config.get() == {"a": {"b": 1}}  # missing keys removed again
+    assert config.get() is data and data["a"] is a
+
+    with config.a.b.patch(2):
+        config.a.b.set(3)
+    assert config.a.b.get() == 1
+
+    def read_local() -> int:
+        config.a.b.set(6, local=True)
+        return int(config.a.b.get())
+
+    with config.a.b.patch(2, local=True):
+        assert config.a.b.get() == 2
+        assert contextvars.copy_context().run(read_local) == 6
+        assert config.a.b.get() == 2 and config.get() == {"a": {"b": 1}}
+    assert config.a.b.get() == 1
+    config.a.b.set(7, local=True)
+    assert config.a.b.get() == 7
+    config.a.b.reset()
+    assert config.a.b.get() == 1
+
+
+def test_config_reset() -> None:
+    config = Configuration({"a": {"b": 1}, "c": {"d": 2}})
+    data = config.get()
+    a = data["a"]
+
+    config.a.b.set(3)
+    config.a.e.f.set(4)
+    config.c.set(5)
+    config.c.set(6)
+    config.c.reset()
+    assert config.get() == {"a": {"b": 3, "e": {"f": 4}}, "c": {"d": 2}}
+    config.a.e.set(7)
+    config.a.e.reset()
+    assert config.get() == {"a": {"b": 3}, "c": {"d": 2}}
+
+    config.a.set({"g": 8})
+    config.a.b.reset()  # the write above is undone as a whole
+    assert config.get() == {"a": {"b": 1}, "c": {"d": 2}}
+
+    config.a.b.set(9)
+    with config.patch({"a": {"b": 10}}):
+        config.reset()
+        assert config.a.b.get() == 1
+    assert config.get() is data and data["a"] is a
+
+    config.set({"a": 11})
+    config.a.set(12)
+    config.reset()
+    assert config.get() == {"a": 11}  # back to the last set
+
+
+def test_config_reset_notifies() -> None:
+    config = Configuration({"b": 1})
+    x: ReactiveFactory[Any] = ReactiveFactory(lambda x: x, config.a.x)
+    config.a.x.set(1)
+    assert x.get() == 1
+    config.a.y.reset()  # undoes the write of `a` it is below
+    assert config.get() == {"b": 1}
+    with pytest.raises(KeyError):
+        x.get()
+
+
 def test_complex_container() -> None:
     @container
     class Options:
@@ -253,3 +917,36 @@ def test_complex_container() -> None:
     OPTIONS.config.set({"address": "a.com", "port": 100})
     assert OPTIONS.metrics.get() == ("a.com", 100)
     assert RUNTIME.metrics.get() == ("a.com", 100)
+
+
+def test_chain_inject_cached() -> None:
+    import pickle
+
+    @container
+    class Options:
+        cpu: Provider[int] = Static(2)
+
+        @Factory
+        @staticmethod
+        def worker(cpu: int = Provide[cpu]) -> int:
+            return cpu * 2
+
+        @Factory
+        @staticmethod
+        def pool(worker: int = Provide[worker]) -> List[int]:
+            return [worker]
+
+    OPTIONS = Options()
+
+    assert OPTIONS.pool.get() == [4]
+    wrapper = OPTIONS.pool._injected
+    assert wrapper is not None
+    assert OPTIONS.pool.get() == [4]
+    assert OPTIONS.pool._injected is wrapper
+    with OPTIONS.cpu.patch(3):
+        assert OPTIONS.pool.get() == [6]
+
+    restored = pickle.loads(pickle.dumps(OPTIONS.pool))
+    assert restored._injected is None
+    assert restored.get() == [4]
+    assert restored._injected is not None
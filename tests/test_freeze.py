@@ -0,0 +1,101 @@
+"""
+container freezing tests
+"""
+import asyncio
+
+import pytest
+
+from simple_di import Provide, Provider, container, freeze, inject, unfreeze
+from simple_di.providers import (
+    AsyncSingletonFactory,
+    Configuration,
+    Factory,
+    Placeholder,
+    SingletonFactory,
+    Static,
+)
+
+
+def test_freeze() -> None:
+    @container
+    class Nested:
+        name: Provider[str] = Static("nested")
+
+    @container
+    class Options:
+        config: Configuration = Configuration({"a": {"b": 1}})
+        cpu: Provider[int] = Static(2)
+        port: Provider[int] = Placeholder()
+        host: Provider[str] = Placeholder()
+        model: Provider[object] = SingletonFactory(object)
+        pending: Provider[object] = SingletonFactory(object)
+        worker: Provider[int] = Factory(lambda c: c * 2, cpu)
+        nested: Nested = Nested()
+
+    OPTIONS = Options()
+    OPTIONS.port.set(5000)
+    model = OPTIONS.model.get()
+
+    @inject
+    def func(
+        cpu: int = Provide[OPTIONS.cpu],
+        b: int = Provide[OPTIONS.config.a.b],
+        worker: int = Provide[OPTIONS.worker],
+    ) -> int:
+        return cpu + b + worker
+
+    frozen = freeze(OPTIONS)
+    assert sorted(frozen) == ["config", "cpu", "model", "nested.name", "port"]
+    assert OPTIONS.config.a.b._frozen
+    assert OPTIONS.config.a._frozen  # items created after freezing
+    assert OPTIONS.model.get() is model
+    assert func() == 7
+
+    for provider in (OPTIONS.cpu, OPTIONS.port, OPTIONS.model, OPTIONS.nested.name):
+        with pytest.raises(RuntimeError):
+            provider.set(1)  # type: ignore
+        with pytest.raises(RuntimeError):
+            with provider.patch(1, local=True):  # type: ignore
+                pass
+        with pytest.raises(RuntimeError):
+            provider.reset()
+    with pytest.raises(RuntimeError):
+        OPTIONS.config.set({})
+    with pytest.raises(RuntimeError):
+        OPTIONS.config.a.b.set(2)
+    with pytest.raises(RuntimeError):
+        with OPTIONS.config.a.b.patch(2):
+            pass
+    with pytest.raises(RuntimeError):
+        OPTIONS.config.reset()
+    key: Provider[str] = Static("b")
+    with pytest.raises(RuntimeError):
+        OPTIONS.config.a[key].set(5)  # items with provider keys are not frozen
+    with pytest.raises(RuntimeError):
+        OPTIONS.config.a[key].reset()
+    assert OPTIONS.config.get() == {"a": {"b": 1}}
+
+    OPTIONS.host.set("localhost")  # not frozen
+    OPTIONS.pending.get()
+
+    unfreeze(OPTIONS)
+    assert not OPTIONS.cpu._frozen
+    assert not OPTIONS.config.a.b._frozen
+    OPTIONS.cpu.set(3)
+    OPTIONS.config.a.b.set(2)
+    assert func() == 11
+
+
+def test_freeze_async() -> None:
+    @container
+    class Options:
+        session: Provider[object] = AsyncSingletonFactory(object)
+
+    OPTIONS = Options()
+    loop = asyncio.new_event_loop()
+    try:
+        session = loop.run_until_complete(OPTIONS.session.aget())
+        assert freeze(OPTIONS) == ["session"]
+        assert loop.run_until_complete(OPTIONS.session.aget()) is session
+    finally:
+        loop.close()
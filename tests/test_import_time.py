@@ -0,0 +1,65 @@
+"""
+cold import cost tests
+"""
+import os
+import subprocess
+import sys
+from typing import Dict, Set, Tuple
+
+import pytest
+
+import simple_di
+
+pytestmark = pytest.mark.skipif(
+    sys.version_info < (3, 7), reason="-X importtime requires python 3.7"
+)
+
+# cumulative microseconds of a cold `import simple_di.providers`, only checked when
+# set, as wall-clock timings depend on the machine
+IMPORT_BUDGET_US = int(os.environ.get("SIMPLE_DI_IMPORT_BUDGET_US") or 0)
+
+LAZY_MODULES = ("asyncio", "dataclasses", "inspect", "pickle", "zlib")
+
+
+def _cold_import(module: str) -> Tuple[Dict[str, int], Set[str]]:
+    """
+    import the module in a fresh interpreter, returning the cumulative import time
+    of each module and the modules the import added
+    """
+    root = os.path.dirname(os.path.dirname(os.path.abspath(simple_di.__file__)))
+    env = dict(os.environ, PYTHONPATH=root)
+    code = (
+        "import sys; before = set(sys.modules); "
+        f"import {module}; print(' '.join(set(sys.modules) - before))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        env=env,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        check=True,
+        universal_newlines=True,
+    )
+    times: Dict[str, int] = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        times[name.strip()] = int(cumulative)
+    return times, set(result.stdout.split())
+
+
+def test_lazy_imports() -> None:
+    _, imported = _cold_import("simple_di.providers")
+    assert not imported.intersection(LAZY_MODULES)
+
+
+@pytest.mark.skipif(
+    not IMPORT_BUDGET_US, reason="SIMPLE_DI_IMPORT_BUDGET_US is not set"
+)
+def test_import_budget() -> None:
+    cost = min(
+        _cold_import("simple_di.providers")[0]["simple_di.providers"]
+        for _ in range(3)
+    )
+    assert cost < IMPORT_BUDGET_US, f"import took {cost}us over the budget"
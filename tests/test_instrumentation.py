@@ -0,0 +1,243 @@
+"""
+instrumentation hooks tests
+"""
+import contextlib
+from typing import Any, Dict, Generator, List, Optional, Tuple
+
+import pytest
+
+from simple_di import (
+    Provide,
+    Provider,
+    ResolutionEvent,
+    ResolutionHook,
+    container,
+    inject,
+)
+from simple_di.instrumentation import (
+    ResolutionProfiler,
+    ResolutionStats,
+    TracingHook,
+    instrumented,
+)
+from simple_di.providers import (
+    Configuration,
+    Factory,
+    FamilyFactory,
+    SingletonFactory,
+    Static,
+)
+
+
+@container
+class Options:
+    config: Configuration = Configuration({"b": {"c": 1}})
+    cpu: Provider[int] = Static(2)
+    worker: Provider[int] = Factory(lambda c, b: 2 * c + b, cpu, config.b.c)
+    model: Provider[object] = SingletonFactory(object)
+
+
+OPTIONS = Options()
+
+
+@inject
+def func(
+    worker: int = Provide[OPTIONS.worker], model: object = Provide[OPTIONS.model]
+) -> int:
+    return worker
+
+
+def test_resolution_stats() -> None:
+    events: List[Tuple[str, str, int]] = []
+
+    class Recorder(ResolutionStats):
+        def on_end(self, event: ResolutionEvent, token: Any) -> None:
+            super().on_end(event, token)
+            events.append((event.name, event.source, event.depth))
+
+    with instrumented(Recorder()) as stats:
+        assert func() == 5
+        assert func() == 5
+        with OPTIONS.cpu.patch(3):
+            assert func() == 7
+
+    assert func() == 5  # removed
+    summary = stats.summary()  # type: ignore
+
+    assert summary["func"]["count"] == 3
+    assert summary["Options.worker"]["count"] == 3
+    assert summary["Options.model"]["sources"] == {"factory": 1, "cache": 2}
+    assert summary["Options.model"]["cache_hit_rate"] == pytest.approx(2 / 3)
+    assert summary["Options.cpu"]["sources"] == {"factory": 2, "override": 1}
+    assert summary["Options.worker"]["p50"] >= summary["Options.cpu"]["p50"]
+
+    assert events[:6] == [
+        ("Options.cpu", "factory", 2),
+        ("Options.config", "factory", 3),
+        ("Options.config.b.c", "factory", 2),
+        ("Options.worker", "factory", 1),
+        ("Options.model", "factory", 1),
+        ("func", "call", 0),
+    ]
+
+
+def test_family_sources() -> None:
+    family = FamilyFactory(lambda key: key * 2)
+    doubled = Factory(lambda a, b: a + b, family["a"], family["a"])
+
+    with instrumented(ResolutionStats()) as stats:
+        with ResolutionProfiler() as profiler:
+            assert family.get("b") == family.get("b") == "bb"
+            assert doubled.get() == "aaaa"
+    summary = stats.summary()  # type: ignore
+    assert summary[family._describe()]["sources"] == {"factory": 2, "cache": 2}
+    assert summary[family._describe()]["cache_hit_rate"] == 0.5
+    assert summary[family["a"]._describe()]["sources"] == {"factory": 1, "cache": 1}
+    assert profiler.redundant() == {}
+
+
+def test_resolution_error() -> None:
+    @container
+    class Failing:
+        value: Provider[int] = Factory(lambda: 1 // 0)
+
+    with instrumented(ResolutionStats()) as stats:
+        with pytest.raises(ZeroDivisionError):
+            Failing.value.get()
+    assert stats.summary()["Failing.value"]["errors"] == 1  # type: ignore
+
+
+class FakeSpan:
+    def __init__(self, name: str, parent: Optional["FakeSpan"]) -> None:
+        self.name = name
+        self.parent = parent
+        self.attributes: Dict[str, Any] = {}
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+
+class FakeTracer:
+    def __init__(self) -> None:
+        self.current: Optional[FakeSpan] = None
+        self.spans: List[FakeSpan] = []
+
+    @contextlib.contextmanager
+    def start_as_current_span(
+        self, name: str, attributes: Dict[str, Any]
+    ) -> Generator[FakeSpan, None, None]:
+        span = FakeSpan(name, self.current)
+        span.attributes.update(attributes)
+        self.spans.append(span)
+        self.current = span
+        try:
+            yield span
+        finally:
+            self.current = span.parent
+
+
+def test_tracing_hook() -> None:
+    tracer = FakeTracer()
+    with instrumented(TracingHook(tracer)):
+        func()
+
+    parents = {
+        span.name: span.parent.name if span.parent else None for span in tracer.spans
+    }
+    assert parents["func"] is None
+    assert parents["Options.worker"] == "func"
+    assert parents["Options.cpu"] == "Options.worker"
+    assert tracer.spans[0].attributes["simple_di.source"] == "call"
+    assert "simple_di.duration" in tracer.spans[0].attributes
+
+
+def test_hooks_unwind_in_order() -> None:
+    tracer = FakeTracer()
+    calls: List[str] = []
+
+    class Recorder(TracingHook):
+        def __init__(self, label: str) -> None:
+            super().__init__(tracer, label)
+
+        def on_start(self, event: ResolutionEvent) -> Any:
+            calls.append(f"start {self._prefix}")
+            return super().on_start(event)
+
+        def on_end(self, event: ResolutionEvent, token: Any) -> None:
+            calls.append(f"end {self._prefix}")
+            super().on_end(event, token)
+
+    with instrumented(Recorder("a")), instrumented(Recorder("b")):
+        OPTIONS.cpu.get()
+    assert calls == ["start a", "start b", "end b", "end a"]
+    assert tracer.current is None
+
+    class Failing(ResolutionHook):
+        def on_start(self, event: ResolutionEvent) -> Any:
+            raise RuntimeError("hook failed")
+
+    calls.clear()
+    with instrumented(Recorder("a")), instrumented(Failing()):
+        with pytest.raises(RuntimeError):
+            OPTIONS.cpu.get()
+    assert calls == ["start a", "end a"]
+    assert tracer.current is None
+
+
+def test_resolution_profiler(tmp_path: Any) -> None:
+    import json
+
+    profiler = ResolutionProfiler()
+
+    @profiler
+    def handler() -> int:
+        return func() + func()
+
+    assert handler() == 10
+    with profiler:
+        assert func() == 5
+    assert func() == 5  # removed
+
+    data = profiler.to_dict()
+    roots = {r["name"]: r for r in data["roots"]}
+    assert roots["func"]["count"] == 3
+    children = {c["name"]: c for c in roots["func"]["children"]}
+    assert children["Options.worker"]["count"] == 3
+    assert children["Options.model"]["sources"]["cache"] >= 2
+    assert sum(t["count"] for t in data["trees"]) == 3
+
+    lines = profiler.folded().splitlines()
+    stacks = {line.rsplit(" ", 1)[0] for line in lines}
+    assert "func;Options.worker;Options.cpu" in stacks
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+
+    profiler.write_folded(str(tmp_path / "out.folded"))
+    profiler.write_json(str(tmp_path / "out.json"))
+    with open(str(tmp_path / "out.json")) as f:
+        assert json.load(f)["roots"][0]["name"] == "func"
+
+
+def test_overlapping_profilers() -> None:
+    outer = ResolutionProfiler()
+
+    @outer
+    def handler() -> int:
+        with ResolutionProfiler() as inner:
+            func()
+        assert [r["name"] for r in inner.to_dict()["roots"]] == ["func"]
+        return func()
+
+    handler()
+    roots = outer.to_dict()["roots"]
+    assert [(r["name"], r["count"]) for r in roots] == [("func", 2)]
+    assert "func" not in {c["name"] for c in roots[0]["children"]}
+
+
+def test_profiler_redundant() -> None:
+    built = Factory(lambda: 1)
+    twice = Factory(lambda a, b: a + b, built, built)
+
+    with ResolutionProfiler() as profiler:
+        assert twice.get() == 2
+    redundant = profiler.redundant()
+    assert list(redundant.values()) == [1]
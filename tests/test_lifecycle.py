@@ -0,0 +1,242 @@
+"""
+container lifecycle tests
+"""
+import asyncio
+import os
+import pickle
+import subprocess
+import sys
+import threading
+import time
+from typing import AsyncGenerator, Dict, Generator, List, Tuple
+
+import pytest
+
+import simple_di
+from simple_di import Provide, Provider, container
+from simple_di.lifecycle import (
+    ashutdown,
+    per_process,
+    prefork,
+    shareable,
+    shutdown,
+    warmup,
+)
+from simple_di.providers import Configuration, Factory, Resource, SingletonFactory
+
+
+def test_warmup() -> None:
+    built: List[str] = []
+    lock = threading.Lock()
+
+    def build(name: str, *deps: str) -> str:
+        time.sleep(0.1)
+        with lock:
+            assert all(d in built for d in deps)
+            built.append(name)
+        return name
+
+    @container
+    class Options:
+        config = Configuration({"name": "c"})
+        a: Provider[str] = SingletonFactory(build, "a")
+        b: Provider[str] = SingletonFactory(build, config.name)
+        ab: Provider[Tuple[str, str]] = Factory(lambda a, b: (a, b), a, b)
+        d: Provider[str] = SingletonFactory(lambda ab: build("d", *ab), ab)
+
+        @SingletonFactory
+        @staticmethod
+        def e(d: str = Provide[d]) -> str:
+            return build("e", d)
+
+    OPTIONS = Options()
+
+    start = time.perf_counter()
+    timings = warmup(OPTIONS, max_workers=4)
+    assert time.perf_counter() - start < 0.35
+
+    assert set(timings) == {"a", "b", "d"}  # e is not a dataclass field
+    assert built[2:] == ["d"]
+    assert OPTIONS.e.get() == "e"
+    assert built[3:] == ["e"]
+
+
+def test_warmup_failure() -> None:
+    def fail() -> int:
+        raise ValueError()
+
+    @container
+    class Options:
+        a: Provider[int] = SingletonFactory(fail)
+        b: Provider[Dict[str, int]] = SingletonFactory(lambda a: {"a": a}, a)
+
+    with pytest.raises(ValueError):
+        warmup(Options())
+
+
+def test_resource_shutdown() -> None:
+    events: List[str] = []
+
+    def pool(name: str, *deps: str) -> Generator[str, None, None]:
+        events.append(f"open {name}")
+        yield name
+        time.sleep(0.1)
+        events.append(f"close {name}")
+
+    def hang() -> Generator[str, None, None]:
+        yield "hang"
+        time.sleep(1)
+
+    @container
+    class Options:
+        a: Provider[str] = Resource(pool, "a")
+        b: Provider[str] = Resource(pool, "b")
+        c: Provider[str] = Resource(pool, "c", a, b)
+        d: Provider[str] = Resource(hang)
+
+    OPTIONS = Options()
+
+    assert OPTIONS.c.get() == "c"
+    assert OPTIONS.c.get() == "c"
+    assert pickle.loads(pickle.dumps(OPTIONS.c))._cache is not OPTIONS.c.get()
+    OPTIONS.d.get()
+
+    start = time.perf_counter()
+    with pytest.raises(RuntimeError, match="failed to shut down d"):
+        shutdown(OPTIONS, timeout=0.5)
+    assert time.perf_counter() - start < 0.9
+    assert events[3] == "close c"
+    assert sorted(events[4:]) == ["close a", "close b"]
+
+    shutdown(OPTIONS)  # nothing built since the last shutdown
+    assert len(events) == 6
+    assert OPTIONS.a.get() == "a"
+    assert events[-1] == "open a"
+
+
+def test_shutdown_abandons_teardown() -> None:
+    code = """
+import time
+from simple_di import Provider, container
+from simple_di.lifecycle import shutdown
+from simple_di.providers import Resource
+
+def hang():
+    yield 1
+    time.sleep(3)
+
+@container
+class Options:
+    hang: Provider[int] = Resource(hang)
+
+OPTIONS = Options()
+OPTIONS.hang.get()
+try:
+    shutdown(OPTIONS, timeout=0.1)
+except RuntimeError:
+    pass
+else:
+    raise AssertionError("the teardown did not time out")
+"""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(simple_di.__file__)))
+    start = time.perf_counter()
+    subprocess.run(
+        [sys.executable, "-c", code], env=dict(os.environ, PYTHONPATH=root), check=True
+    )
+    assert time.perf_counter() - start < 2  # the teardown does not delay the exit
+
+
+def test_async_resource_shutdown() -> None:
+    events: List[str] = []
+
+    async def open_session() -> AsyncGenerator[str, None]:
+        events.append("open session")
+        yield "session"
+        await asyncio.sleep(0)
+        events.append("close session")
+
+    def open_pool(session: str) -> Generator[str, None, None]:
+        yield "pool"
+        events.append("close pool")
+
+    @container
+    class Options:
+        session: Provider[str] = Resource(open_session)
+        pool: Provider[str] = Resource(open_pool, session)
+
+    OPTIONS = Options()
+
+    async def main() -> Dict[str, float]:
+        values = await asyncio.gather(*(OPTIONS.session.aget() for _ in range(5)))
+        assert values == ["session"] * 5
+        return await ashutdown(OPTIONS)
+
+    assert warmup(OPTIONS) == {}  # left to aget
+    loop = asyncio.new_event_loop()
+    try:
+        with pytest.raises(RuntimeError):
+            OPTIONS.session.get()
+        assert set(loop.run_until_complete(main())) == {"session", "pool"}
+    finally:
+        loop.close()
+    assert events == ["open session", "close session"]
+
+
+def test_prefork() -> None:
+    @container
+    class Options:
+        table: Provider[Dict[str, int]] = shareable(SingletonFactory(dict, a=1))
+        pool: Provider[object] = per_process(SingletonFactory(object))
+        other: Provider[object] = SingletonFactory(object)
+
+    OPTIONS = Options()
+    assert set(prefork(OPTIONS, freeze_gc=False)) == {"table"}
+    assert OPTIONS.table._is_cached()
+    assert not OPTIONS.pool._is_cached()
+    assert not OPTIONS.other._is_cached()
+
+    with pytest.raises(ValueError):
+        shareable(OPTIONS.pool)
+
+    @container
+    class Unsafe:
+        pool: Provider[object] = per_process(SingletonFactory(object))
+        client: Provider[Tuple[object]] = shareable(
+            SingletonFactory(lambda p: (p,), pool)
+        )
+
+    with pytest.raises(ValueError):
+        prefork(Unsafe(), freeze_gc=False)
+
+
+@pytest.mark.skipif(not hasattr(os, "register_at_fork"), reason="requires os.fork")
+def test_fork_drops_per_process() -> None:
+    @container
+    class Options:
+        table: Provider[object] = shareable(SingletonFactory(object))
+        pool: Provider[object] = per_process(SingletonFactory(object))
+        client: Provider[Tuple[object]] = SingletonFactory(lambda p: (p,), pool)
+
+    OPTIONS = Options()
+    prefork(OPTIONS, freeze_gc=False)
+    table, pool, client = OPTIONS.table.get(), OPTIONS.pool.get(), OPTIONS.client.get()
+
+    read, write = os.pipe()
+    pid = os.fork()
+    if pid == 0:  # child
+        try:
+            ok = (
+                OPTIONS.table.get() is table
+                and OPTIONS.pool.get() is not pool
+                and OPTIONS.client.get() is not client
+                and OPTIONS.client.get()[0] is OPTIONS.pool.get()
+            )
+            os.write(write, b"1" if ok else b"0")
+        finally:
+            os._exit(0)
+    os.close(write)
+    _, status = os.waitpid(pid, 0)
+    assert os.read(read, 1) == b"1"
+    os.close(read)
+    assert status == 0
+    assert OPTIONS.pool.get() is pool  # the parent is untouched
@@ -0,0 +1,158 @@
+"""
+container snapshot tests
+"""
+from typing import Any, Dict, List, Tuple
+
+import pytest
+
+from simple_di import (
+    ContainerSnapshot,
+    Provide,
+    Provider,
+    container,
+    inject,
+    snapshot,
+)
+from simple_di.providers import (
+    AsyncFactory,
+    Configuration,
+    Factory,
+    FamilyFactory,
+    Placeholder,
+    ScopedFactory,
+    SingletonFactory,
+    Static,
+    scope,
+)
+
+
+def test_snapshot() -> None:
+    @container
+    class Nested:
+        name: Provider[str] = Static("nested")
+
+    @container
+    class Options:
+        config: Configuration = Configuration({"a": {"b": 1}})
+        cpu: Provider[int] = Static(2)
+        worker: Provider[Dict[str, int]] = Factory(lambda c: {"c": c}, cpu)
+        model: Provider[object] = SingletonFactory(object)
+        nested: Nested = Nested()
+        clients: FamilyFactory[str] = FamilyFactory(lambda k: k)
+
+    OPTIONS = Options()
+
+    snap = snapshot(OPTIONS)
+    assert snap.clients is OPTIONS.clients
+    assert snap.cpu == 2
+    assert snap.config == {"a": {"b": 1}}
+    assert snap.model is OPTIONS.model.get()
+    assert snap.nested.name == "nested"
+    with pytest.raises(AttributeError):
+        snap.cpu = 3
+    assert snap.refresh() is snap
+
+    worker = snap.worker
+    OPTIONS.nested.name.set("changed")
+    refreshed = snap.refresh()
+    assert refreshed is not snap
+    assert refreshed.nested.name == "changed"
+    assert refreshed.worker is worker  # not resolved again
+    assert snap.nested.name == "nested"  # the old snapshot is unchanged
+
+    OPTIONS.cpu.set(4)
+    refreshed = refreshed.refresh()
+    assert refreshed.cpu == 4
+    assert refreshed.worker == {"c": 4}
+    assert refreshed.model is snap.model
+
+    partial = snapshot(OPTIONS, "cpu")
+    assert partial.cpu == 4
+    assert not hasattr(partial, "worker")
+    assert isinstance(partial, ContainerSnapshot)
+
+
+def test_inject_snapshot() -> None:
+    @container
+    class Options:
+        config: Configuration = Configuration({"a": {"b": 1}})
+        cpu: Provider[int] = Static(2)
+        port: Provider[int] = Static(5000)
+
+    OPTIONS = Options()
+    calls: List[int] = []
+
+    def resolve() -> int:
+        calls.append(1)
+        return 3
+
+    other = Factory(resolve)
+    snap = snapshot(OPTIONS, "config", "cpu")
+
+    @inject(snapshot=snap)
+    def func(
+        cpu: int = Provide[OPTIONS.cpu],
+        b: int = Provide[OPTIONS.config.a.b],
+        port: int = Provide[OPTIONS.port],
+        other: int = Provide[other],
+    ) -> Tuple[int, int, int, int]:
+        return cpu, b, port, other
+
+    assert func() == (2, 1, 5000, 3)
+    OPTIONS.cpu.set(4)
+    OPTIONS.config.a.b.set(5)
+    OPTIONS.port.set(5001)
+    assert func() == (2, 1, 5001, 3)  # only the snapshot entries are frozen
+    assert func(cpu=6) == (6, 1, 5001, 3)
+    assert len(calls) == 3
+
+    rebound = inject(func, snapshot=snap.refresh())
+    assert rebound() == (4, 5, 5001, 3)
+    compiled = inject(func, snapshot=snap.refresh(), compiled=True)
+    assert compiled() == (4, 5, 5001, 3)
+
+
+def test_snapshot_missing_config_path() -> None:
+    @container
+    class Options:
+        config: Configuration = Configuration({"a": {}})
+
+    OPTIONS = Options()
+    snap = snapshot(OPTIONS)
+
+    @inject(snapshot=snap)
+    def func(b: Any = Provide[OPTIONS.config.a.b]) -> Any:
+        return b
+
+    with pytest.raises(KeyError):
+        func()
+    OPTIONS.config.a.b.set(1)
+    assert func() == 1
+
+
+def test_snapshot_unresolvable() -> None:
+    async def connect() -> str:
+        return "connection"
+
+    @container
+    class Options:
+        connection: Provider[str] = AsyncFactory(connect)
+        request_id: Provider[int] = ScopedFactory(lambda: 1)
+        token: Provider[str] = Placeholder()
+        auth: Provider[str] = Factory(lambda t: f"Bearer {t}", token)
+        config: Configuration = Configuration()
+        port: Provider[int] = Static(5000)
+
+    OPTIONS = Options()
+    snap = snapshot(OPTIONS)
+    for name in ("connection", "request_id", "token", "auth", "config"):
+        assert getattr(snap, name) is getattr(OPTIONS, name)  # kept as providers
+    assert snap.port == 5000
+
+    OPTIONS.token.set("t")
+    OPTIONS.config.set({})
+    snap = snap.refresh()
+    assert snap.auth == "Bearer t"
+    assert snap.config == {}
+    with scope():
+        assert snapshot(OPTIONS).request_id is OPTIONS.request_id
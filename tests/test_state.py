@@ -3,10 +3,26 @@ state loading & saving tests
 """
 import pickle
 import uuid
-from typing import NoReturn, Tuple
-
-from simple_di import VT, Provide, Provider, container, inject, sync_container
-from simple_di.providers import Configuration, Factory, SingletonFactory, Static
+from typing import Callable, NoReturn, Tuple
+
+from simple_di import (
+    VT,
+    Provide,
+    Provider,
+    apply_container_delta,
+    compact_pickling,
+    container,
+    container_delta,
+    inject,
+    sync_container,
+)
+from simple_di.providers import (
+    Configuration,
+    Factory,
+    FamilyFactory,
+    SingletonFactory,
+    Static,
+)
 
 
 class NotPicklable:
@@ -53,6 +69,65 @@ def test_lambda_factory_state() -> None:
     assert uid == RestoredOptions.uid2.get()  # restore state of SingletonFactory
 
 
+def test_anonymous_registry() -> None:
+    first = Factory(lambda: 1)
+    second = Factory(lambda: 2)
+    assert first._func.__qualname__ != second._func.__qualname__
+    assert [k for k in globals() if k.startswith("__simple_di")] == ["__simple_di__"]
+
+    funcs = [first._func, second._func]
+    funcs += [Options.uid._func, Options.uid2._func]  # type: ignore
+    for protocol in range(pickle.HIGHEST_PROTOCOL + 1):
+        for func in funcs:
+            assert pickle.loads(pickle.dumps(func, protocol=protocol)) is func
+
+
+def register() -> int:
+    return 0
+
+
+def test_anonymous_registry_collisions() -> None:
+    def named(name: str, value: int) -> Callable[[], int]:
+        def func() -> int:
+            return value
+
+        func.__qualname__ = name
+        return func
+
+    # names of the registry attributes, and names the counter suffixes could take
+    factories = [Factory(register), Factory(named("_counts", 1))]
+    factories += [Factory(named("f", i)) for i in (2, 3)]
+    factories += [Factory(named(n, i)) for n, i in (("f1", 4), ("f__1", 5))]
+    factories.append(Factory(lambda: 6))
+
+    assert [f.get() for f in factories] == [0, 1, 2, 3, 4, 5, 6]
+    for factory in factories:
+        func = factory._func
+        assert pickle.loads(pickle.dumps(func)) is func
+
+
+def test_lazy_state() -> None:
+    lazy = pickle.loads(pickle.dumps(Provide.lazy[Static(5)]))
+    assert lazy.get() + 1 == 6
+
+    plus_one = Factory(lambda n: n + 1, Provide.lazy[Static(5)])
+    restored = pickle.loads(pickle.dumps(plus_one))
+    assert restored.get() == 6
+    lazy = restored._args[0]
+    lazy._provider.set(7)
+    assert lazy in lazy._provider._dependents and restored.get() == 8
+
+
+def test_family_state() -> None:
+    family = FamilyFactory(lambda key, p: (key, p), Options.status, maxsize=4)
+    family.get("a")
+    member = family["a"]
+    restored = pickle.loads(pickle.dumps(member))
+    assert restored._family.keys() == []  # values are not shipped
+    assert restored._family._maxsize == 4
+    assert restored.get() == ("a", 1)
+
+
 def test_singleton_state() -> None:
     no_picklable = Options.no_picklable.get()
     RestoredOptions = pickle.loads(pickle.dumps(Options))
@@ -68,6 +143,19 @@ def test_config_state() -> None:
     assert value == RestoredOptions.config.b.a.get()  # restore config value
 
 
+def test_config_layers_state() -> None:
+    Options.config.set({"a": 1, "b": {"a": 1}})
+    Options.config.add_layer("env", {"b": {"a": 2}})
+    try:
+        RestoredOptions = pickle.loads(pickle.dumps(Options))
+        assert RestoredOptions.config.layer_names() == ["env"]
+        assert RestoredOptions.config.b.a.get() == 2
+        RestoredOptions.config.remove_layer("env")
+        assert RestoredOptions.config.b.a.get() == 1
+    finally:
+        Options.config.remove_layer("env")
+
+
 def _assert_options(options: OptionsClass) -> None:
     assert options.status.get() == 2, options.status.get()
 
@@ -108,6 +196,60 @@ def test_sync_container() -> None:
     assert p.exitcode == 0
 
 
+def test_container_delta() -> None:
+    Options.status.reset()
+    Options.config.set({"a": 1})
+    RestoredOptions = pickle.loads(pickle.dumps(Options))
+
+    delta = container_delta(Options)
+    assert {"status", "config"} <= set(delta.states)
+
+    Options.status.set(3)
+    Options.config.a.set(2)
+    delta = container_delta(Options, since=delta.version)
+    assert set(delta.states) == {"status", "config"}
+
+    apply_container_delta(RestoredOptions, pickle.loads(pickle.dumps(delta)))
+    assert RestoredOptions.status.get() == 3
+    assert RestoredOptions.config.a.get() == 2
+
+    assert container_delta(Options, since=delta.version).states == {}
+    Options.status.reset()
+
+    @container
+    class Local:
+        uid: Provider[str] = SingletonFactory(lambda: uuid.uuid4().hex)
+
+    version = container_delta(Local()).version
+    uid = Local.uid.get()
+    delta = container_delta(Local(), since=version)
+    assert delta.states["uid"]["_cache"] == uid
+
+
+@container
+class CompactOptionsClass:
+    not_picklable: Provider[NotPicklable] = SingletonFactory(NotPicklable)
+    config: Configuration = Configuration()
+
+
+CompactOptions = CompactOptionsClass()
+
+
+def test_compact_pickling() -> None:
+    CompactOptions.config.set({f"k{i}": {"value": i} for i in range(1000)})
+    not_picklable = CompactOptions.not_picklable.get()
+
+    with compact_pickling():
+        bytes_ = pickle.dumps(CompactOptions)
+    assert len(bytes_) < len(pickle.dumps(CompactOptions.config))
+
+    RestoredOptions = pickle.loads(bytes_)
+    assert RestoredOptions.config.k10.value.get() == 10
+    restored = RestoredOptions.not_picklable.get()
+    assert isinstance(restored, NotPicklable)
+    assert restored is not not_picklable
+
+
 def test_integration() -> None:
     @inject
     def func1(